@@ -0,0 +1,52 @@
+import os
+import threading
+
+# --- KONFIGURATION ---
+API_TIMEOUT_MS = int(os.getenv("GENAI_TIMEOUT_MS", "120000"))   # Timeout für SDK-Aufrufe
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))         # Verbindungen pro Host
+FAKE_BACKEND = os.getenv("GEMINI_FAKE_BACKEND") == "1"          # lokales Fake-Backend statt Google
+RATE_LIMIT = os.getenv("GEMINI_RATE_LIMIT", "1") != "0"         # Drosselung + Retries (rate_limit.py)
+
+_lock = threading.Lock()
+_clients = {}
+_sessions = {}
+
+
+def get_client(api_key=None):
+    """Ein `genai.Client` pro Prozess und API-Key (wird nicht bei jedem Rerun neu gebaut).
+
+    Mit `GEMINI_FAKE_BACKEND=1` kommt stattdessen der lokale `FakeGeminiClient`.
+    Alle Aufrufe laufen über `rate_limit.RateLimitedClient` (Token-Bucket pro Endpoint,
+    Retries mit Backoff), außer bei `GEMINI_RATE_LIMIT=0`.
+    """
+    api_key = api_key or os.getenv("GOOGLE_API_KEY")
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            if FAKE_BACKEND:
+                from fake_gemini import FakeGeminiClient
+                client = FakeGeminiClient()
+            else:
+                from google import genai
+                from google.genai import types
+                client = genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=API_TIMEOUT_MS))
+            if RATE_LIMIT:
+                from rate_limit import RateLimitedClient
+                client = RateLimitedClient(client)
+            _clients[api_key] = client
+    return client
+
+
+def get_http_session(pool_size=HTTP_POOL_SIZE):
+    """Geteilte `requests.Session` mit Keep-Alive und Verbindungs-Pool (spart TLS-Handshakes)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    with _lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[pool_size] = session
+    return session
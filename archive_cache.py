@@ -0,0 +1,88 @@
+import os
+import zipfile
+import hashlib
+import threading
+from io import BytesIO
+
+import metrics
+from batch_ingest import IMAGE_EXTENSIONS
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+ARCHIVE_FOLDER = os.path.join(OUTPUT_FOLDER, ".archives")
+
+
+def _image_files(folder_path):
+    files = []
+    for root, dirs, names in os.walk(folder_path):
+        for name in names:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                files.append(os.path.join(root, name))
+    files.sort()
+    return files
+
+
+def create_zip_of_folder(folder_path):
+    """Erstellt ein ZIP-Archiv im Speicher aus einem Ordner.
+
+    Bilder sind schon komprimiert, daher `ZIP_STORED` statt `ZIP_DEFLATED`.
+    """
+    memory_file = BytesIO()
+    with metrics.span("zip"), zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_STORED) as zf:
+        for file_path in _image_files(folder_path):
+            zf.write(file_path, os.path.basename(file_path))
+    memory_file.seek(0)
+    return memory_file
+
+
+def folder_signature(folder_path, files=None):
+    """Fingerabdruck des Ordnerinhalts (Name, Größe, mtime) – ändert sich bei jeder Änderung."""
+    digest = hashlib.sha1()
+    for file_path in files if files is not None else _image_files(folder_path):
+        stat = os.stat(file_path)
+        digest.update(f"{os.path.relpath(file_path, folder_path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def archive_path(folder_path, name=None, files=None):
+    """Pfad des gecachten Archivs für den aktuellen Ordnerinhalt."""
+    name = name or os.path.basename(os.path.normpath(folder_path))
+    return os.path.join(ARCHIVE_FOLDER, f"{name}-{folder_signature(folder_path, files)}.zip")
+
+
+def get_folder_archive(folder_path, name=None, files=None, build=True):
+    """Gibt den Pfad eines ZIP-Archivs (ZIP_STORED, auf der Platte) für den Ordner zurück.
+
+    Das Archiv wird nur neu gebaut, wenn sich der Ordnerinhalt geändert hat;
+    veraltete Archive desselben Ordners werden dabei entfernt. Mit
+    `build=False` wird nur ein vorhandenes Archiv geliefert (sonst None).
+    Über `files` kann eine Teilmenge der Bilder archiviert werden – auch aus
+    Unterordnern, z.B. alle Job-Ordner einer Kollektion (Pfade im ZIP relativ zu `folder_path`).
+    """
+    name = name or os.path.basename(os.path.normpath(folder_path))
+    files = files if files is not None else _image_files(folder_path)
+    path = archive_path(folder_path, name, files)
+    if os.path.exists(path):
+        return path
+    if not build:
+        return None
+
+    os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+    # Eindeutig pro Prozess und Thread: zwei Sessions können dasselbe Archiv gleichzeitig bauen
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with metrics.span("zip"), zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as zf:
+        for file_path in files:
+            # Relativ zum Ordner, damit gleichnamige Bilder mehrerer Jobs nicht kollidieren
+            zf.write(file_path, os.path.relpath(file_path, folder_path))
+    os.replace(tmp_path, path)
+
+    # Alte Versionen desselben Ordners aufräumen
+    prefix = f"{name}-"
+    for old in os.listdir(ARCHIVE_FOLDER):
+        old_path = os.path.join(ARCHIVE_FOLDER, old)
+        if old.startswith(prefix) and old.endswith(".zip") and old_path != path and len(old) == len(os.path.basename(path)):
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass   # schon von einer anderen Session aufgeräumt
+    return path
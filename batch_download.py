@@ -0,0 +1,136 @@
+import os
+import time
+import requests
+
+import api_client
+import metrics
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+DOWNLOAD_FOLDER = os.path.join(OUTPUT_FOLDER, ".downloads")
+API_BASE_URL = "https://generativelanguage.googleapis.com"
+CHUNK_SIZE = 1024 * 1024           # 1 MB pro Chunk
+REQUEST_TIMEOUT = (10, 120)        # (Verbindungsaufbau, Lesen) in Sekunden
+MAX_RETRIES = 5
+
+_RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+
+def result_download_url(file_name, base_url=API_BASE_URL):
+    """Baut die Download-URL einer Ergebnisdatei direkt aus ihrem Namen (ohne Listen-Suche)."""
+    return f"{base_url}/download/v1beta/{file_name}:download"
+
+
+def _candidate_urls(client, file_name):
+    """Direkte URL zuerst, danach die URI aus einem einzelnen `files.get`-Aufruf."""
+    yield result_download_url(file_name, getattr(client, "download_base_url", API_BASE_URL))
+    try:
+        uri = client.files.get(name=file_name).uri
+    except Exception:
+        uri = None
+    if uri:
+        yield uri
+
+
+def download_to_file(url, dest_path, api_key, session=None, chunk_size=CHUNK_SIZE, max_retries=MAX_RETRIES):
+    """Lädt `url` in Chunks nach `dest_path` und setzt abgebrochene Downloads per HTTP-Range fort.
+
+    Zwischenstände liegen in `<dest_path>.part`; erst ein vollständiger Download
+    wird umbenannt. Gibt `dest_path` zurück oder wirft eine Exception.
+    Angefragt wird ohne Kompression (`Accept-Encoding: identity`), damit Range-Offset,
+    Content-Length und die Größe der `.part`-Datei dieselben Bytes zählen.
+    """
+    http = session or api_client.get_http_session()
+    part_path = dest_path + ".part"
+    headers = {"x-goog-api-key": api_key, "Accept-Encoding": "identity"}
+    attempt = 0
+
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+
+        try:
+            with http.get(url, headers=request_headers, params={'alt': 'media'},
+                          stream=True, timeout=REQUEST_TIMEOUT) as response:
+                if response.status_code == 416 and offset:
+                    # Alles schon da
+                    break
+                if response.status_code >= 500:
+                    raise requests.exceptions.ConnectionError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+
+                # Komprimiert der Server trotzdem, passen Offsets und Längen nicht zu den
+                # dekodierten Bytes auf der Platte -> nicht fortsetzen und Länge nicht prüfen
+                encoded = response.headers.get("Content-Encoding", "identity").lower() != "identity"
+                if offset and (response.status_code != 206 or encoded):
+                    # Server ignoriert Range (oder Range zählt komprimierte Bytes) -> von vorne
+                    if response.status_code == 206:
+                        response.close()
+                        os.remove(part_path)
+                        continue
+                    offset = 0
+                mode = "ab" if offset else "wb"
+
+                expected = response.headers.get("Content-Length")
+                expected = offset + int(expected) if expected and not encoded else None
+
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            metrics.inc("bytes_downloaded_total", len(chunk))
+
+                if expected is not None and os.path.getsize(part_path) < expected:
+                    raise requests.exceptions.ChunkedEncodingError("Download unvollständig")
+                break
+
+        except _RETRY_ERRORS as e:
+            attempt += 1
+            metrics.inc("download_retries_total")
+            if attempt > max_retries:
+                raise
+            wait = min(2 ** attempt, 30)
+            print(f"⚠️  Verbindung abgebrochen ({e}), setze in {wait}s fort...")
+            time.sleep(wait)
+
+    os.replace(part_path, dest_path)
+    return dest_path
+
+
+def fetch_result_file(client, api_key, file_name, dest_path=None, session=None):
+    """Holt die Ergebnisdatei eines Batch-Jobs auf die Platte und gibt den Pfad zurück.
+
+    Reihenfolge: Streaming-Download (direkte URL, dann `files.get`-URI),
+    als letzter Ausweg `client.files.download` (komplett im Speicher).
+    """
+    if dest_path is None:
+        os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+        dest_path = os.path.join(DOWNLOAD_FOLDER, file_name.split('/')[-1] + ".jsonl")
+
+    if os.path.exists(dest_path):
+        return dest_path
+
+    last_error = None
+    for url in _candidate_urls(client, file_name):
+        try:
+            return download_to_file(url, dest_path, api_key, session=session)
+        except requests.exceptions.HTTPError as e:
+            # 404 o.ä. -> nächste URL probieren (Teildatei verwerfen)
+            last_error = e
+            if os.path.exists(dest_path + ".part"):
+                os.remove(dest_path + ".part")
+
+    try:
+        content_bytes = client.files.download(file=file_name)
+    except Exception as e:
+        raise RuntimeError(f"Download fehlgeschlagen: {last_error or e}") from e
+    with open(dest_path, "wb") as f:
+        f.write(content_bytes)
+    metrics.inc("bytes_downloaded_total", len(content_bytes))
+    return dest_path
@@ -0,0 +1,337 @@
+import os
+import json
+import base64
+from io import BytesIO
+from functools import partial
+from contextlib import nullcontext
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import image_store
+import metrics
+from ingest_journal import IngestJournal
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+MIME_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+# Ab dieser Größe der Ergebnisdatei wird (im Automatik-Modus) mit Prozessen statt Threads ingestiert:
+# json.loads und base64 halten den GIL, Threads nutzen dann nur einen Kern
+PROCESS_INGEST_MIN_BYTES = 64 * 1024 * 1024
+
+
+def _iter_text_lines(text_content):
+    """Zerlegt einen großen String zeilenweise, ohne eine Kopie als Liste anzulegen."""
+    start = 0
+    length = len(text_content)
+    while start < length:
+        end = text_content.find("\n", start)
+        if end == -1:
+            end = length
+        yield text_content[start:end]
+        start = end + 1
+
+
+def _looks_like_path(source):
+    return isinstance(source, str) and len(source) < 4096 and "\n" not in source and os.path.isfile(source)
+
+
+def iter_result_lines(source):
+    """Liefert die Zeilen einer Batch-Ergebnisdatei einzeln.
+
+    `source` darf ein Dateipfad, ein Byte-/Text-Stream (z.B. `open(..., "rb")`,
+    `response.raw`), ein fertiger String/Bytes-Block oder ein Iterable von
+    Zeilen sein. Es liegt immer nur eine Zeile gleichzeitig im Speicher.
+    """
+    if isinstance(source, os.PathLike) or _looks_like_path(source):
+        with open(source, "rb") as f:
+            yield from iter_result_lines(f)
+        return
+
+    if isinstance(source, str):
+        lines = _iter_text_lines(source)
+    elif isinstance(source, (bytes, bytearray)):
+        lines = _iter_text_lines(source.decode("utf-8"))
+    else:
+        lines = source
+
+    for line in lines:
+        if isinstance(line, (bytes, bytearray)):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_inline_images(result_json):
+    """Liefert alle `inlineData`-Teile einer einzelnen Ergebniszeile."""
+    generation_response = result_json.get("response")
+    if not generation_response or "candidates" not in generation_response:
+        return
+    candidates = generation_response["candidates"]
+    if not candidates or "content" not in candidates[0]:
+        return
+    for part in candidates[0]["content"].get("parts", []):
+        if "inlineData" in part:
+            yield part["inlineData"]
+
+
+def sniff_extension(img_bytes, mime_type=None):
+    """Ermittelt die Dateiendung anhand der Magic Bytes, sonst über den MIME-Type."""
+    head = img_bytes[:12]
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    return MIME_EXTENSIONS.get((mime_type or "").lower(), ".png")
+
+
+def validate_image(img_bytes):
+    """Günstige Prüfung: liest nur den Header (`Image.verify`), ohne komplett zu dekodieren."""
+    from PIL import Image
+    Image.open(BytesIO(img_bytes)).verify()
+
+
+def write_image_file(img_bytes, job_folder, count, inline_data=None, prefix="img_", validate=False,
+                     use_store=True, name_by_digest=False):
+    """Standard-Writer: speichert die dekodierten Bytes unverändert (kein Re-Encode).
+
+    Die Endung kommt aus den Magic Bytes bzw. `inlineData.mimeType`. Mit `use_store`
+    liegt der Inhalt einmal im Content-Store und der Job-Ordner verweist per Hardlink
+    darauf – erneutes Einlesen desselben Ergebnisses schreibt nichts neu.
+    Mit `name_by_digest` wird statt der Nummer der Inhalts-Hash als Dateiname genutzt.
+    """
+    if validate:
+        validate_image(img_bytes)
+    mime_type = inline_data.get("mimeType") if inline_data else None
+    ext = sniff_extension(img_bytes, mime_type)
+    digest = image_store.digest_bytes(img_bytes) if (use_store or name_by_digest) else None
+    name = digest[:16] if name_by_digest else count
+    filename = f"{job_folder}/{prefix}{name}{ext}"
+
+    if use_store:
+        image_store.link_into(image_store.store_bytes(img_bytes, ext, digest), filename)
+    else:
+        with open(filename, "wb") as f:
+            f.write(img_bytes)
+    return filename
+
+
+def make_image_writer(prefix="img_", validate=False, use_store=True, name_by_digest=False):
+    """Writer mit eigenem Dateipräfix / Header-Prüfung (picklebar, also auch für Prozesse)."""
+    return partial(write_image_file, prefix=prefix, validate=validate,
+                   use_store=use_store, name_by_digest=name_by_digest)
+
+
+def _empty_reason(result_json):
+    """Warum eine Zeile keine Bilder enthält (API-Fehler oder finishReason)."""
+    if result_json.get("error"):
+        return json.dumps(result_json["error"], ensure_ascii=False)[:500]
+    candidates = (result_json.get("response") or {}).get("candidates") or []
+    if candidates and candidates[0].get("finishReason"):
+        return f"finishReason {candidates[0]['finishReason']}"
+    return "keine Bilder in der Antwort"
+
+
+def _error_text(part_index, error):
+    return f"Bild {part_index}: {type(error).__name__}: {error}"
+
+
+def ingest_results(source, job_folder, write_image=write_image_file, start_count=0, journal=None):
+    """Streaming-Ingest: dekodiert jedes Bild einzeln, schreibt es und gibt es sofort frei.
+
+    Der Spitzenverbrauch hängt damit nur vom größten Einzelbild ab,
+    nicht von der Anzahl der Bilder im Batch.
+    Mit einem `IngestJournal` werden schon fertige Zeilen übersprungen und
+    Erfolg/Fehler jeder Zeile festgehalten. Die Nummer eines Bildes ist dann
+    seine Position in der Datei, damit ein erneuter Versuch dieselben Namen bekommt.
+    """
+    if not os.path.exists(job_folder):
+        os.makedirs(job_folder)
+
+    saved_files = []
+    count = start_count
+    for line_index, line in enumerate(iter_result_lines(source)):
+        done = journal.skip(line_index) if journal is not None else None
+        if done:
+            files, parts = done
+            saved_files.extend(files)
+            count += parts
+            continue
+
+        try:
+            result_json = json.loads(line)
+        except ValueError as e:
+            # Kaputte Zeile überspringen, aber festhalten
+            if journal is not None:
+                journal.fail(line_index, f"Ungültiges JSON: {e}")
+            continue
+        del line
+
+        written = []
+        errors = []
+        parts = 0
+        for part_index, inline_data in enumerate(iter_inline_images(result_json)):
+            parts += 1
+            try:
+                with metrics.span("decode"):
+                    img_bytes = base64.b64decode(inline_data["data"])
+                with metrics.span("write"):
+                    filename = write_image(img_bytes, job_folder, count, inline_data)
+            except Exception as e:
+                errors.append(_error_text(part_index, e))
+                if journal is not None:
+                    # Nummer freihalten, damit ein erneuter Versuch dieselbe bekommt
+                    count += 1
+                continue
+            finally:
+                inline_data["data"] = None
+            written.append(filename)
+            count += 1
+
+        saved_files.extend(written)
+        if journal is not None:
+            journal.record(line_index, written, parts, errors, key=result_json.get("key"),
+                           reason=None if parts else _empty_reason(result_json))
+    metrics.inc("images_ingested_total", len(saved_files))
+    return saved_files
+
+
+def _ingest_line(line, line_index, job_folder, write_image):
+    """Worker: dekodiert und schreibt alle Bilder einer Zeile unter vorläufigen Namen.
+
+    Gibt `(geschrieben, fehler, teile, key, grund)` zurück; `geschrieben` enthält
+    `(teil, label, pfad)`, `grund` erklärt eine Zeile ohne Bilder.
+    """
+    try:
+        result_json = json.loads(line)
+    except ValueError as e:
+        return [], [f"Ungültiges JSON: {e}"], 0, None, None
+    del line
+
+    written = []
+    errors = []
+    parts = 0
+    for part_index, inline_data in enumerate(iter_inline_images(result_json)):
+        parts += 1
+        label = f"tmp{line_index}-{part_index}"
+        try:
+            with metrics.span("decode"):
+                img_bytes = base64.b64decode(inline_data["data"])
+            inline_data["data"] = None
+            with metrics.span("write"):
+                written.append((part_index, label, write_image(img_bytes, job_folder, label, inline_data)))
+        except Exception as e:
+            errors.append(_error_text(part_index, e))
+    reason = None if parts else _empty_reason(result_json)
+    return written, errors, parts, result_json.get("key"), reason
+
+
+def ingest_results_parallel(source, job_folder, workers=None, use_processes=False,
+                            write_image=write_image_file, start_count=0, journal=None):
+    """Wie `ingest_results`, verteilt die Zeilen aber auf einen Worker-Pool.
+
+    Die Nummerierung bleibt deterministisch: Worker schreiben unter einem
+    vorläufigen Namen, der Hauptthread benennt in Zeilenreihenfolge um.
+    Es sind höchstens `2 * workers` Zeilen gleichzeitig unterwegs, der
+    Speicherbedarf bleibt also unabhängig von der Batch-Größe.
+    Für Prozesse muss `write_image` eine Modul-Funktion sein (picklebar).
+    Das `journal` wird nur im aufrufenden Thread beschrieben.
+    """
+    if not os.path.exists(job_folder):
+        os.makedirs(job_folder)
+
+    workers = workers or os.cpu_count() or 1
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+
+    saved_files = []
+    count = start_count
+
+    def collect(line_index, future):
+        nonlocal count
+        if future is None:
+            # Laut Journal schon fertig
+            files, parts = journal.skip(line_index)
+            saved_files.extend(files)
+            count += parts
+            return
+
+        written, errors, parts, key, reason = future.result()
+        if parts == 0 and errors:
+            if journal is not None:
+                journal.fail(line_index, errors[0])
+            return
+        files = []
+        for index, (part_index, label, tmp_filename) in enumerate(written):
+            # Mit Journal: Nummer = Position in der Datei, sonst fortlaufend
+            number = count + (part_index if journal is not None else index)
+            folder, base = os.path.split(tmp_filename)
+            filename = os.path.join(folder, base.replace(label, str(number)))
+            os.replace(tmp_filename, filename)
+            files.append(filename)
+        count += parts if journal is not None else len(written)
+        saved_files.extend(files)
+        if journal is not None:
+            journal.record(line_index, files, parts, errors, key=key, reason=reason)
+
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for line_index, line in enumerate(iter_result_lines(source)):
+            if journal is not None and journal.skip(line_index):
+                pending.append((line_index, None))
+            else:
+                pending.append((line_index, executor.submit(_ingest_line, line, line_index, job_folder, write_image)))
+            del line
+            if len(pending) >= 2 * workers:
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+
+    metrics.inc("images_ingested_total", len(saved_files))
+    return saved_files
+
+
+def job_folder_for(job_id):
+    """Unterordner für die Bilder eines Jobs."""
+    clean_job_id = job_id.split('/')[-1]
+    return os.path.join(OUTPUT_FOLDER, clean_job_id)
+
+
+def wants_processes(content, workers, use_processes=None):
+    """Prozesse oder Threads? `use_processes=None` entscheidet nach Größe der Ergebnisdatei."""
+    if not workers or workers < 2:
+        return False
+    if use_processes is not None:
+        return use_processes
+    return _looks_like_path(content) and os.path.getsize(content) >= PROCESS_INGEST_MIN_BYTES
+
+
+def process_downloaded_content(content, job_id, workers=1, validate=False, resume=True, use_processes=None):
+    """Speichert alle Bilder einer Ergebnisdatei im Job-Ordner.
+
+    `content` kann wie bisher der komplette Text sein, aber auch ein Pfad
+    oder ein Stream – dann wird zeilenweise gelesen. Mit `workers > 1`
+    übernimmt ein Worker-Pool das Dekodieren und Schreiben: Prozesse mit
+    `use_processes=True`, Threads mit False, bei None Prozesse erst für große
+    Dateien (siehe `wants_processes`). Mit `validate` wird jeder Bild-Header
+    vor dem Speichern geprüft. Mit `resume` führt ein Ingest-Journal Buch;
+    ein erneuter Lauf verarbeitet nur noch offene/gescheiterte Zeilen.
+    """
+    write_image = make_image_writer(validate=validate)
+    folder = job_folder_for(job_id)
+    with (IngestJournal(job_id) if resume else nullcontext()) as journal:
+        if workers and workers > 1:
+            return ingest_results_parallel(content, folder, workers=workers,
+                                           use_processes=wants_processes(content, workers, use_processes),
+                                           write_image=write_image, journal=journal)
+        return ingest_results(content, folder, write_image=write_image, journal=journal)
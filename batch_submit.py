@@ -0,0 +1,160 @@
+import json
+import time
+import uuid
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import job_store
+import metrics
+
+# --- KONFIGURATION ---
+IMAGE_MODEL = "gemini-3-pro-image-preview"
+IMAGE_MODELS = ["gemini-3-pro-image-preview", "gemini-2.5-flash-image"]
+ASPECT_RATIOS = ["1:1", "2:3", "3:2", "3:4", "4:3", "4:5", "5:4", "9:16", "16:9", "21:9"]
+MAX_REQUESTS_PER_JOB = 100     # größere Kollektionen werden auf mehrere Batch-Jobs verteilt
+MAX_PARALLEL_UPLOADS = 4
+REQUEST_KEY_PREFIX = "req-"     # Key jeder Anfrage = Präfix + Index des Prompts im Job
+
+
+def request_key(index):
+    """Key der Anfrage zum `index`-ten Prompt eines Jobs, z.B. `req-00012`."""
+    return f"{REQUEST_KEY_PREFIX}{index:05d}"
+
+
+def prompt_index(key):
+    """Umkehrung von `request_key`: Index des Prompts oder None (fremder/fehlender Key)."""
+    if not key or not key.startswith(REQUEST_KEY_PREFIX):
+        return None
+    try:
+        return int(key[len(REQUEST_KEY_PREFIX):])
+    except ValueError:
+        return None
+
+
+def build_request(prompt_text, generation_config=None, key=None):
+    """Eine Zeile der Batch-Datei für einen Bild-Prompt.
+
+    Der `key` kommt in der Ergebniszeile unverändert zurück und verbindet so Bild und Prompt
+    (die Ergebnisse sind nicht zwingend in Eingabereihenfolge).
+    """
+    line = {"key": key} if key else {}
+    line["request"] = {
+        "contents": [
+            {"parts": [{"text": prompt_text}]}
+        ],
+        "generation_config": generation_config or {
+            "response_modalities": ["IMAGE"]
+        }
+    }
+    return line
+
+
+def build_request_buffer(prompts, generation_config=None):
+    """Serialisiert die Anfragen als JSONL in einen Speicherpuffer (keine Temp-Datei).
+
+    Jede Zeile bekommt `request_key(index)`, passend zur Reihenfolge in `job_prompts`.
+    """
+    buffer = BytesIO()
+    for index, prompt_text in enumerate(prompts):
+        request = build_request(prompt_text, generation_config, key=request_key(index))
+        buffer.write(json.dumps(request).encode("utf-8"))
+        buffer.write(b"\n")
+    buffer.seek(0)
+    return buffer
+
+
+def split_prompts(prompts, max_per_job=MAX_REQUESTS_PER_JOB):
+    """Teilt die Prompts in gleich große Stücke von höchstens `max_per_job`."""
+    if not prompts:
+        return []
+    shards = -(-len(prompts) // max_per_job)
+    size = -(-len(prompts) // shards)
+    return [prompts[i:i + size] for i in range(0, len(prompts), size)]
+
+
+def generation_config_for(aspect_ratio=None):
+    """Bild-Konfiguration einer Anfrage, optional mit festem Seitenverhältnis."""
+    config = {"response_modalities": ["IMAGE"]}
+    if aspect_ratio:
+        config["image_config"] = {"aspect_ratio": aspect_ratio}
+    return config
+
+
+def build_variants(models=None, aspect_ratios=None):
+    """Alle Kombinationen aus Modellen und Seitenverhältnissen als Varianten-Dicts.
+
+    Jede Variante hat `name`, `model` und `generation_config`. Ohne Angaben gibt es
+    genau eine Variante (Standardmodell, Standardformat).
+    """
+    variants = []
+    for model in models or [IMAGE_MODEL]:
+        for aspect_ratio in aspect_ratios or [None]:
+            name = f"{model} {aspect_ratio}" if aspect_ratio else model
+            variants.append({"name": name, "model": model, "generation_config": generation_config_for(aspect_ratio)})
+    return variants
+
+
+def submit_batch(client, prompts, model=IMAGE_MODEL, display_name=None, generation_config=None):
+    """Lädt die Anfragen aus dem Speicher hoch und startet einen Batch-Job. Gibt den Job-Namen zurück."""
+    config = {'mime_type': 'application/json'}
+    if display_name:
+        config['display_name'] = display_name
+    with metrics.span("upload"):
+        batch_file = client.files.upload(file=build_request_buffer(prompts, generation_config), config=config)
+    with metrics.span("batch_create"):
+        batch_job = client.batches.create(model=model, src=batch_file.name)
+    return batch_job.name
+
+
+def plan_jobs(prompts, variants, max_per_job=MAX_REQUESTS_PER_JOB, split=True):
+    """Verteilt die Prompts auf Varianten und Job-Größen. Gibt `[(variante, prompts), ...]` zurück.
+
+    Mit `split` bekommt jede Variante einen eigenen Teil der Prompts (reihum), die
+    Kollektion ist also schneller fertig; sonst erzeugt jede Variante alle Prompts.
+    """
+    plan = []
+    for index, variant in enumerate(variants):
+        share = prompts[index::len(variants)] if split else prompts
+        for shard in split_prompts(share, max_per_job):
+            plan.append((variant, shard))
+    return plan
+
+
+def submit_collection(client, theme, prompts, model=IMAGE_MODEL, max_per_job=MAX_REQUESTS_PER_JOB,
+                      max_workers=MAX_PARALLEL_UPLOADS, timings=None, variants=None, split=True):
+    """Startet eine Kollektion als einen oder mehrere Batch-Jobs (parallel hochgeladen).
+
+    Alle Jobs landen mit derselben `collection_id` in der Job-Datenbank.
+    `timings` (z.B. `{"theme": 1.2, "prompts": 8.4}`) wird mit der Upload-Dauer
+    als Zeitprofil bei jedem Job gespeichert.
+    Mit `variants` (siehe `build_variants`) wird die Kollektion auf mehrere Modelle /
+    Seitenverhältnisse aufgefächert, siehe `plan_jobs` für `split`.
+    Gibt `(collection_id, job_ids, fehler)` zurück; `fehler` ist eine Liste von Exceptions.
+    """
+    timestamp = time.time()
+    collection_id = f"col_{int(timestamp)}_{uuid.uuid4().hex[:6]}"
+    variants = variants or build_variants([model])
+    plan = plan_jobs(prompts, variants, max_per_job, split=split)
+
+    def submit(indexed_job):
+        index, (variant, shard) = indexed_job
+        record = dict(timings or {})
+        with metrics.span("submit", record):
+            job_id = submit_batch(client, shard, model=variant["model"], display_name=f"{collection_id}_{index}",
+                                  generation_config=variant["generation_config"])
+        job_store.save_job(job_id, theme, shard, status="SUBMITTED", timestamp=timestamp,
+                           collection_id=collection_id, model=variant["model"], variant=variant["name"])
+        job_store.record_timings(job_id, record)
+        metrics.inc("jobs_submitted_total")
+        return job_id
+
+    job_ids = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(submit, item) for item in enumerate(plan)]
+        for future in futures:
+            try:
+                job_ids.append(future.result())
+            except Exception as e:
+                errors.append(e)
+    return collection_id, job_ids, errors
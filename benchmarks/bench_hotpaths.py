@@ -0,0 +1,209 @@
+"""Micro-Benchmarks für Ingest, ZIP-Export und Druck-Konvertierung (komplett offline).
+
+Aufruf aus dem Projektordner:
+    python -m benchmarks.bench_hotpaths --images 50 --size 1024
+Ergebnisse landen als JSON in `benchmarks/results/`, damit Läufe vergleichbar bleiben.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+
+from benchmarks.synthetic import write_result_file
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(__file__), "results")
+JOB_ID = "batches/bench"
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux: KB, macOS: Bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- BENCHMARKS (laufen jeweils in einem frischen Prozess im Arbeitsordner) ---
+
+def bench_process_downloaded_content(ctx):
+    from batch_ingest import process_downloaded_content
+    images = process_downloaded_content(ctx["result_file"], JOB_ID)
+    return len(images)
+
+
+def bench_process_downloaded_content_parallel(ctx):
+    from batch_ingest import process_downloaded_content
+    images = process_downloaded_content(ctx["result_file"], JOB_ID, workers=ctx["workers"])
+    return len(images)
+
+
+def bench_process_file_content(ctx):
+    # Die echte CLI-Funktion: check_batch braucht beim Import nur irgendeinen API-Key,
+    # `open <ordner>` am Ende wird übersprungen und die Ausgabe pro Bild verworfen
+    import contextlib
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.system = lambda command: 0
+    import check_batch
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return len(check_batch.process_file_content(ctx["result_file"]))
+
+
+def bench_create_zip_of_folder(ctx):
+    from archive_cache import create_zip_of_folder
+    archive = create_zip_of_folder(ctx["job_folder"])
+    return len(os.listdir(ctx["job_folder"])) if archive.getbuffer().nbytes else 0
+
+
+def bench_get_folder_archive(ctx):
+    from archive_cache import get_folder_archive
+    get_folder_archive(ctx["job_folder"])
+    return len(os.listdir(ctx["job_folder"]))
+
+
+def bench_convert_to_a4(ctx):
+    # Seriell wie früher in Tab 3: konvertieren + als PNG speichern
+    from io import BytesIO
+    from PIL import Image
+    from print_convert import convert_to_a4
+    count = 0
+    for name in sorted(os.listdir(ctx["job_folder"]))[:ctx["print_images"]]:
+        with Image.open(os.path.join(ctx["job_folder"], name)) as image:
+            convert_to_a4(image).save(BytesIO(), "PNG", dpi=(300, 300))
+        count += 1
+    return count
+
+
+def bench_convert_batch_to_zip(ctx):
+    from print_convert import convert_batch_to_zip
+    names = sorted(os.listdir(ctx["job_folder"]))[:ctx["print_images"]]
+    sources = [(n, os.path.join(ctx["job_folder"], n)) for n in names]
+    return convert_batch_to_zip(sources, "print.zip", workers=ctx["workers"])
+
+
+BENCHMARKS = {
+    "process_downloaded_content": bench_process_downloaded_content,
+    "process_downloaded_content_parallel": bench_process_downloaded_content_parallel,
+    "process_file_content": bench_process_file_content,
+    "create_zip_of_folder": bench_create_zip_of_folder,
+    "get_folder_archive": bench_get_folder_archive,
+    "convert_to_a4": bench_convert_to_a4,
+    "convert_batch_to_zip": bench_convert_batch_to_zip,
+}
+
+# Diese Benchmarks brauchen einen bereits gefüllten Job-Ordner
+NEEDS_IMAGES = {"create_zip_of_folder", "get_folder_archive", "convert_to_a4", "convert_batch_to_zip"}
+
+
+def _run_in_child(name, ctx, queue):
+    sys.path.insert(0, ctx["repo_root"])
+    os.chdir(ctx["workdir"])
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    items = BENCHMARKS[name](ctx)
+    wall = time.perf_counter() - start
+    queue.put({
+        "items": items,
+        "wall_s": wall,
+        "peak_rss_mb": _peak_rss_mb(),
+        "baseline_rss_mb": rss_before,
+        # Größter Worker-Prozess (Prozess-Pools)
+        "peak_rss_workers_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    })
+
+
+def run_benchmark(name, ctx):
+    """Startet einen Benchmark in einem eigenen Prozess, damit Peak-RSS pro Benchmark stimmt."""
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_", dir=ctx["tmp_root"])
+    if name in NEEDS_IMAGES:
+        shutil.copytree(os.path.join(ctx["tmp_root"], "prepared"), workdir, dirs_exist_ok=True, symlinks=True)
+    child_ctx = dict(ctx, workdir=workdir, job_folder=os.path.join("NanoBilder_Batch", JOB_ID.split('/')[-1]))
+
+    mp = multiprocessing.get_context("spawn")
+    queue = mp.Queue()
+    process = mp.Process(target=_run_in_child, args=(name, child_ctx, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    mb = ctx["result_bytes"] / (1024 * 1024)
+    result["name"] = name
+    result["items_per_s"] = result["items"] / result["wall_s"] if result["wall_s"] else None
+    if name not in NEEDS_IMAGES:
+        result["input_mb_per_s"] = mb / result["wall_s"] if result["wall_s"] else None
+    return result
+
+
+def prepare(ctx):
+    """Erzeugt die synthetische Ergebnisdatei und einen gefüllten Job-Ordner als Vorlage."""
+    ctx["result_bytes"] = write_result_file(ctx["result_file"], ctx["images"], ctx["size"], ctx["size"])
+    prepared = os.path.join(ctx["tmp_root"], "prepared")
+    os.makedirs(prepared)
+    sys.path.insert(0, ctx["repo_root"])
+    cwd = os.getcwd()
+    os.chdir(prepared)
+    try:
+        from batch_ingest import ingest_results, make_image_writer
+        # Ohne Content-Store, damit die Vorlage einfach kopiert werden kann
+        ingest_results(ctx["result_file"], os.path.join("NanoBilder_Batch", JOB_ID.split('/')[-1]),
+                       write_image=make_image_writer(use_store=False))
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Benchmarks der Hot Paths")
+    parser.add_argument("--images", type=int, default=20, help="Anzahl Bilder im synthetischen Batch")
+    parser.add_argument("--size", type=int, default=1024, help="Kantenlänge der Bilder in Pixeln")
+    parser.add_argument("--print-images", type=int, default=8, help="Anzahl Bilder für die A4-Benchmarks")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="Nur diese Benchmarks")
+    parser.add_argument("--output", default=RESULTS_FOLDER, help="Ordner für die JSON-Ergebnisse")
+    args = parser.parse_args()
+
+    tmp_root = tempfile.mkdtemp(prefix="junkjournal_bench_")
+    ctx = {
+        "repo_root": os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "tmp_root": tmp_root,
+        "result_file": os.path.join(tmp_root, "results.jsonl"),
+        "images": args.images,
+        "size": args.size,
+        "print_images": args.print_images,
+        "workers": args.workers,
+    }
+
+    try:
+        print(f"🧪 Erzeuge {args.images} synthetische Bilder ({args.size}x{args.size})...")
+        prepare(ctx)
+        print(f"📄 Ergebnisdatei: {ctx['result_bytes'] / (1024 * 1024):.1f} MB")
+
+        results = []
+        for name in args.only or BENCHMARKS:
+            result = run_benchmark(name, ctx)
+            results.append(result)
+            print(f"   {name:40s} {result['wall_s']:8.3f} s  {result['items_per_s'] or 0:8.1f} Bilder/s  "
+                  f"Peak-RSS {result['peak_rss_mb']:7.1f} MB")
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {k: ctx[k] for k in ("images", "size", "print_images", "workers", "result_bytes")},
+        "results": results,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"💾 Ergebnisse gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Kaltstart-Messung: Importzeit der App-Module und (falls Streamlit installiert ist) erster Skriptlauf.
+
+Aufruf aus dem Projektordner:
+    python -m benchmarks.bench_startup --repeat 5
+Jede Messung läuft in einem frischen Interpreter, damit nichts aus `sys.modules` mitgezählt wird.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(__file__), "results")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Was der Passwort-Bildschirm wirklich importiert vs. was eine Seite später nachlädt
+IMPORT_SETS = {
+    "startup": ["streamlit", "job_store", "metrics", "batch_ingest"],
+    "page_new_batch": ["api_client", "prompt_generation", "batch_submit", "google.genai"],
+    "page_history": ["job_poller", "batch_download", "thumbnails", "archive_cache", "image_hash", "image_manifest"],
+    "page_print": ["print_convert", "export_profiles"],
+}
+
+_IMPORT_SNIPPET = """
+import sys, time, importlib
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+print(time.perf_counter() - start)
+"""
+
+_APPTEST_SNIPPET = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+os.chdir({workdir!r})
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=120)
+app.secrets["PASSWORD"] = "bench"
+{login}
+app.run()
+print(time.perf_counter() - start)
+"""
+
+
+def _run_python(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "Fehler")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_imports(modules, repeat):
+    return [_run_python(_IMPORT_SNIPPET.format(root=REPO_ROOT, modules=modules)) for _ in range(repeat)]
+
+
+def measure_app(repeat, logged_in):
+    """Erster Skriptlauf in einem frischen Prozess (mit oder ohne eingeloggte Session)."""
+    import tempfile
+    login = 'app.session_state["password_correct"] = True' if logged_in else ""
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="junkjournal_startup_") as workdir:
+            timings.append(_run_python(_APPTEST_SNIPPET.format(
+                root=REPO_ROOT, workdir=workdir, script=os.path.join(REPO_ROOT, "streamlit_app.py"), login=login
+            )))
+    return timings
+
+
+def _summary(values):
+    return {"median_s": statistics.median(values), "min_s": min(values), "max_s": max(values), "runs": len(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaltstart-Messung der App")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Messung")
+    parser.add_argument("--output", default=RESULTS_FOLDER, help="Ordner für die JSON-Ergebnisse")
+    args = parser.parse_args()
+
+    results = {}
+    for name, modules in IMPORT_SETS.items():
+        results[f"import_{name}"] = _summary(measure_imports(modules, args.repeat))
+        print(f"   import {name:20s} {results[f'import_{name}']['median_s'] * 1000:8.1f} ms")
+
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("ℹ️  Streamlit nicht installiert – App-Läufe werden übersprungen.")
+    else:
+        for name, logged_in in (("app_password_screen", False), ("app_logged_in", True)):
+            try:
+                results[name] = _summary(measure_app(args.repeat, logged_in))
+            except RuntimeError as e:
+                print(f"⚠️  {name}: {e}")
+                continue
+            print(f"   {name:27s} {results[name]['median_s'] * 1000:8.1f} ms")
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"startup_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"💾 Ergebnisse gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
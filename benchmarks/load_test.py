@@ -0,0 +1,144 @@
+"""Last-Test gegen das lokale Fake-Backend: viele Kollektionen gleichzeitig einreichen, pollen, laden.
+
+Aufruf aus dem Projektordner:
+    python -m benchmarks.load_test --collections 50 --images 20 --latency 0.05 --error-rate 0.02
+Läuft komplett offline in einem temporären Arbeitsordner; das Ergebnis wird als JSON gespeichert.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import job_store  # noqa: E402
+import metrics  # noqa: E402
+import batch_submit  # noqa: E402
+import prompt_generation  # noqa: E402
+from job_poller import JobPoller  # noqa: E402
+from fake_gemini import FakeGeminiClient  # noqa: E402
+from rate_limit import RateLimitedClient  # noqa: E402
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def submit_one(client, index, images, max_per_job):
+    """Ein kompletter Einreich-Zyklus wie in Tab 1: Thema, Prompts, Upload, Batch-Job(s)."""
+    start = time.perf_counter()
+    theme = prompt_generation.generate_theme(client, f"load test idea {index}", refresh=True)
+    prompts = prompt_generation.generate_prompts(client, theme, images, refresh=True, log=lambda msg: None)
+    collection_id, job_ids, errors = batch_submit.submit_collection(client, theme, prompts, max_per_job=max_per_job)
+    return {
+        "collection_id": collection_id,
+        "jobs": len(job_ids),
+        "errors": [str(e) for e in errors],
+        "submit_s": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Last-Test mit Fake-Gemini-Backend")
+    parser.add_argument("--collections", type=int, default=50, help="Anzahl gleichzeitiger Kollektionen")
+    parser.add_argument("--images", type=int, default=20, help="Bilder pro Kollektion")
+    parser.add_argument("--max-per-job", type=int, default=batch_submit.MAX_REQUESTS_PER_JOB)
+    parser.add_argument("--submitters", type=int, default=8, help="Parallele Einreich-Threads")
+    parser.add_argument("--pollers", type=int, default=8, help="Parallele Status-Prüfungen")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mittlere API-Latenz in Sekunden")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil fehlschlagender API-Aufrufe")
+    parser.add_argument("--job-failure-rate", type=float, default=0.0)
+    parser.add_argument("--download-failure-rate", type=float, default=0.0)
+    parser.add_argument("--pending", type=float, default=1.0, help="Sekunden im Zustand PENDING")
+    parser.add_argument("--running", type=float, default=2.0, help="Sekunden im Zustand RUNNING")
+    parser.add_argument("--timeout", type=float, default=600, help="Abbruch nach so vielen Sekunden")
+    parser.add_argument("--no-limiter", action="store_true", help="Ohne Drosselung/Retries (rate_limit.py)")
+    parser.add_argument("--output", default=RESULTS_FOLDER)
+    args = parser.parse_args()
+
+    client = FakeGeminiClient(
+        latency=args.latency, error_rate=args.error_rate,
+        job_schedule=(("JOB_STATE_PENDING", args.pending), ("JOB_STATE_RUNNING", args.running)),
+        job_failure_rate=args.job_failure_rate, download_failure_rate=args.download_failure_rate,
+    )
+    if not args.no_limiter:
+        client = RateLimitedClient(client)
+
+    workdir = tempfile.mkdtemp(prefix="junkjournal_load_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        print(f"🚀 Reiche {args.collections} Kollektionen à {args.images} Bilder ein...")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.submitters) as executor:
+            futures = [executor.submit(submit_one, client, i, args.images, args.max_per_job)
+                       for i in range(args.collections)]
+            submissions = []
+            submit_failures = []
+            for future in futures:
+                try:
+                    submissions.append(future.result())
+                except Exception as e:
+                    submit_failures.append(str(e))
+        submit_done = time.perf_counter() - start
+        print(f"   eingereicht in {submit_done:.1f} s ({len(submit_failures)} Fehler)")
+
+        print("🔁 Polle bis alle Jobs fertig sind...")
+        poller = JobPoller(client, "fake-key", max_workers=args.pollers, min_interval=0.5, max_interval=5,
+                           log=lambda msg: None)
+        deadline = time.time() + args.timeout
+        while poller.pending_count() and time.time() < deadline:
+            poller.poll_once()
+            time.sleep(0.1)
+        total = time.perf_counter() - start
+
+        jobs = job_store.list_jobs()
+        statuses = {}
+        for job in jobs:
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        submit_times = [s["submit_s"] for s in submissions]
+        report = {
+            "timestamp": time.time(),
+            "params": vars(args),
+            "collections_submitted": len(submissions),
+            "submit_failures": submit_failures + [e for s in submissions for e in s["errors"]],
+            "jobs": len(jobs),
+            "job_status": statuses,
+            "images_ingested": sum(job["image_count"] or 0 for job in jobs),
+            "submit_s": {
+                "p50": statistics.median(submit_times) if submit_times else None,
+                "p95": _percentile(submit_times, 0.95),
+                "max": max(submit_times) if submit_times else None,
+            },
+            "all_submitted_s": submit_done,
+            "all_done_s": total,
+            "api_calls": dict(client.calls),
+            "metrics": metrics.snapshot(),
+        }
+    finally:
+        os.chdir(cwd)
+        client.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"✅ {report['jobs']} Jobs, Status {report['job_status']}, {report['images_ingested']} Bilder "
+          f"in {report['all_done_s']:.1f} s")
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"load_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"💾 Ergebnisse gespeichert: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import json
+import base64
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+
+def make_image_bytes(width=1024, height=1024, fmt="PNG", seed=0):
+    """Zufallsbild (Rauschen + Verlauf), damit die Kompression realistisch schlecht ist."""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    noise = rng.integers(0, 96, size=(height, width, 3), dtype=np.uint8)
+    pixels = np.clip(gradient * 0.6 + noise, 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def make_result_line(img_bytes, mime_type="image/png", key=None):
+    """Eine Ergebniszeile im Format `response.candidates[0].content.parts[].inlineData`."""
+    line = {
+        "response": {
+            "candidates": [{
+                "content": {
+                    "parts": [{"inlineData": {"mimeType": mime_type, "data": base64.b64encode(img_bytes).decode("ascii")}}],
+                    "role": "model",
+                },
+                "finishReason": "STOP",
+            }]
+        }
+    }
+    if key is not None:
+        line["key"] = key
+    return json.dumps(line)
+
+
+def iter_result_lines(count=20, width=1024, height=1024, distinct=None):
+    """Erzeugt `count` Ergebniszeilen; mit `distinct` wiederholen sich die Bilder (spart Rechenzeit)."""
+    images = [make_image_bytes(width, height, seed=i) for i in range(max(1, min(distinct or count, count)))]
+    for i in range(count):
+        yield make_result_line(images[i % len(images)], key=f"req-{i:05d}")
+
+
+def write_result_file(path, count=20, width=1024, height=1024, distinct=None):
+    """Schreibt eine synthetische Batch-Ergebnisdatei (JSONL) und gibt ihre Größe in Bytes zurück."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for line in iter_result_lines(count, width, height, distinct):
+            f.write(line + "\n")
+    return os.path.getsize(path)
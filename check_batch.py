@@ -1,11 +1,13 @@
 import os
-import json
-import time
-import requests
-from google import genai
-from PIL import Image
-from io import BytesIO
+import argparse
+from contextlib import nullcontext
 from dotenv import load_dotenv
+from batch_ingest import ingest_results, ingest_results_parallel, job_folder_for, make_image_writer
+import job_store
+import ingest_journal
+import api_client
+import metrics
+from job_poller import IN_PROGRESS, JobPoller, check_and_ingest
 
 # 1. API Key laden
 load_dotenv()
@@ -17,126 +19,130 @@ if not API_KEY:
 
 OUTPUT_FOLDER = "NanoBilder_Batch"
 
-def process_file_content(text_content):
-    """Hilfsfunktion: Verarbeitet den Textinhalt der Datei zu Bildern"""
-    results = text_content.strip().split('\n')
-    count = 0
-    saved_files = []
-    
-    print(f"📦 Verarbeite {len(results)} Ergebnisse...")
-    
-    for line in results:
-        try:
-            result_json = json.loads(line)
-            generation_response = result_json.get("response")
-            
-            if generation_response and "candidates" in generation_response:
-                candidates = generation_response["candidates"]
-                if candidates and "content" in candidates[0]:
-                    parts = candidates[0]["content"]["parts"]
-                    for part in parts:
-                        if "inlineData" in part:
-                            img_data_b64 = part["inlineData"]["data"]
-                            
-                            import base64
-                            img_bytes = base64.b64decode(img_data_b64)
-                            image = Image.open(BytesIO(img_bytes))
-                            
-                            timestamp = int(time.time())
-                            filename = f"{OUTPUT_FOLDER}/batch_img_{timestamp}_{count}.png"
-                            image.save(filename)
-                            print(f"   ✅ Bild gespeichert: {filename}")
-                            saved_files.append(filename)
-                            count += 1
-        except Exception as parse_error:
-            # Ignoriere leere Zeilen oder Fehler
-            pass
+def process_file_content(content, workers=1, use_processes=False, validate=False, job_id=None):
+    """Hilfsfunktion: Verarbeitet den Inhalt der Datei zu Bildern.
+
+    `content` darf Text, Bytes, ein Dateipfad oder ein Stream sein –
+    die Zeilen werden einzeln gelesen und sofort wieder freigegeben.
+    Mit `workers > 1` wird parallel dekodiert und gespeichert.
+    Die Bilder werden unverändert geschrieben (kein PIL-Re-Encode).
+    Mit `job_id` führt ein Ingest-Journal Buch: ein erneuter Lauf überspringt
+    fertige Zeilen und wiederholt nur die gescheiterten.
+    """
+    # Dateiname aus dem Inhalts-Hash: keine Kollisionen, erneutes Laden überschreibt nichts
+    write_image = make_image_writer(prefix="batch_img_", validate=validate, name_by_digest=True)
+
+    with (ingest_journal.IngestJournal(job_id) if job_id else nullcontext()) as journal:
+        if journal is not None and journal.finished:
+            print(f"♻️ {len(journal.finished)} Zeilen schon verarbeitet, werden übersprungen.")
+        if workers > 1:
+            print(f"📦 Verarbeite Ergebnisse mit {workers} Workern...")
+            saved_files = ingest_results_parallel(content, OUTPUT_FOLDER, workers=workers,
+                                                  use_processes=use_processes, write_image=write_image,
+                                                  journal=journal)
+        else:
+            print("📦 Verarbeite Ergebnisse (Streaming)...")
+            saved_files = ingest_results(content, OUTPUT_FOLDER, write_image=write_image, journal=journal)
+    count = len(saved_files)
+    for filename in saved_files:
+        print(f"   ✅ Bild gespeichert: {filename}")
             
     if count > 0:
         print(f"\n🎉 FERTIG! {count} Bilder gespeichert.")
         os.system(f"open {OUTPUT_FOLDER}")
     else:
         print("⚠️ Keine Bilder im Inhalt gefunden.")
+    if job_id:
+        for failure in ingest_journal.failures(job_id):
+            print(f"   ❌ Zeile {failure['line']}: {failure['error']}")
+    return saved_files
+
+def download_images(client, job_id, workers=1, use_processes=False, validate=False):
+    """Prüft einen Job und lädt ihn über denselben Weg wie der Poller der App (`check_and_ingest`).
 
-def download_images(client, job_id):
+    Claim, Ingest-Journal, Vorschaubilder, Hashes, Manifest und Zeitprofil sind damit
+    identisch; ein schon vollständig geladener Job wird nicht erneut heruntergeladen.
+    """
     print(f"\n🔍 Prüfe Status für Job: {job_id}...")
     
     try:
-        # Status abfragen
-        job = client.batches.get(name=job_id)
-        state = job.state
-        print(f"📊 STATUS: {state}")
-
-        if state == "JOB_STATE_SUCCEEDED":
-            print("\n🚀 Job fertig! Starte Download...")
-            
-            file_name = job.dest.file_name
-            print(f"📄 Dateiname: {file_name}")
-
-            # --- VERSUCH 1: Der offizielle Weg (Dein Snippet) ---
-            try:
-                print("1️⃣  Versuche offiziellen Download (client.files.download)...")
-                # Versuche mit 'file' Parameter statt 'name'
-                file_content_bytes = client.files.download(file=file_name)
-                
-                # Bytes zu String decodieren
-                text_content = file_content_bytes.decode('utf-8')
-                process_file_content(text_content)
-                return # Wenn das klappt, sind wir fertig!
-
-            except Exception as e:
-                print(f"⚠️  Offizieller Weg gescheitert: {e}")
-                print("➡️  Wechsele zu Plan B (Listen-Suche)...")
-
-            # --- VERSUCH 2: Der Listen-Trick (Falls Fehler 400 kommt) ---
-            # Wenn der direkte Download wegen der Länge scheitert, suchen wir die URL manuell
-            download_url = None
-            for f in client.files.list():
-                if f.name == file_name:
-                    print("✅ Datei in der Liste gefunden!")
-                    download_url = f.uri
-                    break
-            
-            if download_url:
-                print(f"🔗 Lade herunter von: {download_url}")
-                headers = {"x-goog-api-key": API_KEY}
-                response = requests.get(download_url, headers=headers, params={'alt': 'media'})
-                if response.status_code == 200:
-                    process_file_content(response.text)
-                else:
-                    print(f"❌ Auch Plan B gescheitert: {response.status_code}")
-            else:
-                print("❌ Datei auch in der Liste nicht gefunden. Google blockiert sie komplett.")
-
-        elif state in ["JOB_STATE_ACTIVE", "JOB_STATE_RUNNING"]:
-            print("\n⏳ Der Job läuft noch.")
-        
-        elif state == "JOB_STATE_FAILED":
-            print(f"\n❌ Job fehlgeschlagen: {job.error}")
-
+        result = check_and_ingest(client, API_KEY, job_id, ingest_workers=workers, validate=validate,
+                                  use_processes=True if use_processes else None)
     except Exception as e:
         print(f"❌ Kritischer Fehler: {e}")
         import traceback
         traceback.print_exc()
+        return
+
+    if result == "COMPLETED":
+        job = job_store.get_job(job_id) or {}
+        folder = job_folder_for(job_id)
+        print(f"\n🎉 FERTIG! {job.get('image_count') or 0} Bilder in {folder}")
+        failures = ingest_journal.failures(job_id)
+        for failure in failures:
+            print(f"   ❌ Zeile {failure['line']}: {failure['error']}")
+        if failures:
+            print("⚠️  Ergebnisdatei bleibt liegen – erneuter Aufruf wiederholt nur die gescheiterten Zeilen.")
+        timings = job_store.get_timings(job_id)
+        if timings:
+            print("⏱️  " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items()))
+        os.system(f"open {folder}")
+
+    elif result == IN_PROGRESS:
+        print("\n⏳ Der Job wird gerade von einem anderen Prozess geladen.")
+
+    elif result == "FAILED":
+        print("\n❌ Job fehlgeschlagen.")
+
+    else:
+        print("\n⏳ Der Job läuft noch.")
 
 # --- HAUPTPROGRAMM ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prüft Batch-Jobs und lädt die Bilder herunter.")
+    parser.add_argument("result_file", nargs="?", help="Lokale Ergebnisdatei (JSONL) direkt verarbeiten")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl paralleler Ingest-Worker (0 = alle Kerne)")
+    parser.add_argument("--processes", action="store_true", help="Prozesse statt Threads für den Ingest nutzen")
+    parser.add_argument("--validate", action="store_true", help="Bild-Header vor dem Speichern prüfen")
+    parser.add_argument("--poll", action="store_true", help="Alle offenen Jobs einmal parallel prüfen und fertige laden")
+    parser.add_argument("--watch", action="store_true", help="Offene Jobs im Hintergrund prüfen, bis alle fertig sind")
+    parser.add_argument("--metrics", help="Metriken am Ende in diese Datei schreiben (.prom oder .json)")
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.METRICS_FILE = args.metrics
+
     if not os.path.exists(OUTPUT_FOLDER):
         print(f"❌ Ordner '{OUTPUT_FOLDER}' fehlt.")
         exit()
 
-    json_files = [f for f in os.listdir(OUTPUT_FOLDER) if f.startswith("batch_job_") and f.endswith(".json")]
+    workers = args.workers or os.cpu_count() or 1
+
+    if args.result_file:
+        print(f"📂 Verarbeite lokale Datei: {args.result_file}")
+        process_file_content(args.result_file, workers=workers, use_processes=args.processes, validate=args.validate)
+        metrics.write_metrics()
+        exit()
+
+    if args.poll or args.watch:
+        client = api_client.get_client(API_KEY)
+        poller = JobPoller(client, API_KEY, ingest_workers=workers, ingest_processes=True if args.processes else None)
+        print(f"🔁 {poller.pending_count()} offene Jobs...")
+        if args.watch:
+            poller.run(until_done=True)
+        else:
+            poller.poll_once()
+        print(f"📊 Noch offen: {poller.pending_count()}")
+        exit()
+
+    job_info = job_store.latest_job()
     
-    if not json_files:
+    if not job_info:
         print(f"❌ Keine Jobs gefunden.")
         exit()
 
-    latest_file = max([os.path.join(OUTPUT_FOLDER, f) for f in json_files], key=os.path.getctime)
-    
-    print(f"📂 Lade Infos: {latest_file}")
-    with open(latest_file, "r") as f:
-        job_info = json.load(f)
-        job_id = job_info["job_id"]
+    job_id = job_info["job_id"]
+    print(f"📂 Lade Infos: {job_id} ({job_info.get('theme')})")
     
-    client = genai.Client(api_key=API_KEY)
-    download_images(client, job_id)
\ No newline at end of file
+    client = api_client.get_client(API_KEY)
+    download_images(client, job_id, workers=workers, use_processes=args.processes, validate=args.validate)
+    metrics.write_metrics()
\ No newline at end of file
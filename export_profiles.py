@@ -0,0 +1,146 @@
+import os
+from io import BytesIO
+
+from PIL import Image
+
+import metrics
+from print_convert import process_into_folder
+
+# --- KONFIGURATION ---
+# Zielgrößen für Etsy: Digital-Download-Dateien dürfen max. 20 MB haben
+EXPORT_PROFILES = {
+    "etsy_jpeg": {
+        "label": "Etsy Digital Download (JPEG ≤ 20 MB, 300 DPI)",
+        "format": "JPEG",
+        "max_bytes": 20 * 1024 * 1024,
+        "max_side": None,
+        "dpi": 300,
+        "quality": (60, 95),
+    },
+    "preview_webp": {
+        "label": "Vorschau (WebP 2000 px, ≤ 1 MB)",
+        "format": "WEBP",
+        "max_bytes": 1024 * 1024,
+        "max_side": 2000,
+        "dpi": 72,
+        "quality": (40, 90),
+    },
+}
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+MIN_SCALE = 0.25     # stärkste Verkleinerung pro Schritt, falls selbst minimale Qualität zu groß ist
+
+
+def _exif_with_dpi(dpi):
+    """EXIF-Block mit Auflösung (für Formate ohne eigenes DPI-Feld wie WebP)."""
+    exif = Image.Exif()
+    exif[0x011A] = dpi     # XResolution
+    exif[0x011B] = dpi     # YResolution
+    exif[0x0128] = 2       # ResolutionUnit: Zoll
+    return exif.tobytes()
+
+
+def _prepare(image, fmt):
+    """Farbmodus passend zum Format (JPEG ohne Transparenz -> weißer Hintergrund)."""
+    if fmt == "JPEG" and image.mode != "RGB":
+        if image.mode in ("RGBA", "LA", "P"):
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        return image.convert("RGB")
+    if fmt == "WEBP" and image.mode not in ("RGB", "RGBA"):
+        return image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    return image
+
+
+def _encode(image, fmt, quality, dpi):
+    buffer = BytesIO()
+    if fmt == "JPEG":
+        image.save(buffer, "JPEG", quality=quality, dpi=(dpi, dpi), optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        image.save(buffer, "WEBP", quality=quality, method=4, exif=_exif_with_dpi(dpi))
+    else:
+        image.save(buffer, fmt, dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+def encode_to_target(image, fmt, max_bytes, dpi, quality=(60, 95)):
+    """Höchste Qualität, deren Datei höchstens `max_bytes` groß ist (binäre Suche).
+
+    Passt selbst die niedrigste Qualität nicht, wird das Bild schrittweise verkleinert.
+    Gibt `(bytes, qualität, bild)` zurück.
+    """
+    low, high = quality
+    image = _prepare(image, fmt)
+    while True:
+        # Häufigster Fall zuerst: beste Qualität passt schon
+        data = _encode(image, fmt, high, dpi)
+        if len(data) <= max_bytes:
+            return data, high, image
+
+        best = None
+        lo, hi = low, high - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            candidate = _encode(image, fmt, mid, dpi)
+            if len(candidate) <= max_bytes:
+                best = (candidate, mid)
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if best:
+            return best[0], best[1], image
+
+        # Auch minimale Qualität zu groß -> Fläche im Verhältnis verkleinern und neu suchen
+        smallest = _encode(image, fmt, low, dpi)
+        if min(image.size) <= 64:
+            return smallest, low, image
+        scale = max(MIN_SCALE, (max_bytes / len(smallest)) ** 0.5 * 0.95)
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                             Image.Resampling.LANCZOS)
+
+
+def export_name(path, profile_key):
+    base = os.path.splitext(os.path.basename(path))[0]
+    return base + EXTENSIONS[EXPORT_PROFILES[profile_key]["format"]]
+
+
+def export_folder_for(folder, profile_key):
+    """Zielordner eines Profils neben den Quellbildern: `<ordner>/<profil>/`."""
+    return os.path.join(folder, profile_key)
+
+
+def export_file(source_path, dest_path, profile_key):
+    """Worker: ein Bild nach Profil kodieren und schreiben. Gibt (Pfad, Qualität, Bytes) zurück."""
+    profile = EXPORT_PROFILES[profile_key]
+    with Image.open(source_path) as image:
+        if profile["max_side"]:
+            # JPEG-Quellen gleich verkleinert dekodieren
+            image.draft("RGB", (profile["max_side"], profile["max_side"]))
+            image.thumbnail((profile["max_side"], profile["max_side"]), Image.Resampling.LANCZOS)
+        else:
+            image.load()
+        data, quality, _ = encode_to_target(image, profile["format"], profile["max_bytes"], profile["dpi"],
+                                            profile["quality"])
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dest_path)
+    return dest_path, quality, len(data)
+
+
+def export_images(paths, folder, profile_key, workers=None, progress=None):
+    """Exportiert Bilder (Originale eines Job-Ordners oder fertige Druckseiten) nach `<ordner>/<profil>/`.
+
+    Kodiert parallel in einem Prozess-Pool; Dateien, die neuer als ihre Quelle sind,
+    bleiben unverändert. `progress(done, total)` nach jedem Bild.
+    Gibt die Pfade der exportierten Dateien (in Eingabereihenfolge) zurück.
+    """
+    outputs, exported = process_into_folder(
+        export_file, paths, export_folder_for(folder, profile_key), lambda path: export_name(path, profile_key),
+        args=(profile_key,), stage="export", workers=workers, progress=progress
+    )
+    if exported:
+        metrics.inc("export_bytes_total", sum(size for _, _, size in exported), profile=profile_key)
+        metrics.inc("images_exported_total", len(exported), profile=profile_key)
+    return outputs
@@ -0,0 +1,284 @@
+"""Lokaler Ersatz für `genai.Client` (Themen, Prompts, Uploads, Batch-Jobs, Ergebnisdateien).
+
+Wird über `api_client.get_client()` eingeschleust, wenn `GEMINI_FAKE_BACKEND=1` gesetzt ist,
+oder direkt als `FakeGeminiClient(...)` übergeben. Latenz, Job-Dauer und Fehler sind einstellbar,
+damit sich Last- und Fehlerverhalten ohne echtes API-Kontingent testen lassen.
+"""
+import re
+import json
+import time
+import uuid
+import zlib
+import base64
+import random
+import struct
+import hashlib
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAPIError(Exception):
+    """Nachbildung der SDK-Fehler (`code` wie HTTP-Status, optional `retry_after`)."""
+
+    def __init__(self, code, message="", retry_after=None):
+        super().__init__(f"{code} {message}".strip())
+        self.code = code
+        self.status = message
+        self.retry_after = retry_after
+
+
+def make_png(width, height, seed):
+    """Minimales, gültiges PNG (einfarbig) ohne Pillow."""
+    color = hashlib.md5(str(seed).encode()).digest()[:3]
+    raw = b"".join(b"\x00" + color * width for _ in range(height))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+class _ResultServer:
+    """Kleiner HTTP-Server für Ergebnisdateien, mit Range-Support und Verbindungsabbrüchen."""
+
+    def __init__(self, backend):
+        backend_ref = backend
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                match = re.search(r"(files/[^:/?]+)", self.path)
+                data = backend_ref._file_bytes(match.group(1)) if match else None
+                if data is None:
+                    self.send_error(404)
+                    return
+
+                start = 0
+                range_header = self.headers.get("Range")
+                if range_header:
+                    start = int(range_header.split("=")[1].split("-")[0])
+                    if start >= len(data):
+                        self.send_response(416)
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                else:
+                    self.send_response(200)
+                body = data[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+                if backend_ref._roll(backend_ref.download_failure_rate):
+                    # Verbindung mitten im Download abbrechen
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="fake-gemini-http")
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+class _Models:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def generate_content(self, model, contents, config=None):
+        self._backend._call("generate_content")
+        text = contents if isinstance(contents, str) else str(contents)
+        match = re.search(r"Generate exactly (\d+) prompts", text)
+        if match:
+            count = int(match.group(1))
+            prompts = [
+                f"Fake vintage junk journal page {uuid.uuid4().hex[:8]} with motif {i} on aged paper, distressed texture"
+                for i in range(count)
+            ]
+            return SimpleNamespace(text="\n".join(prompts))
+        return SimpleNamespace(text=f"Fake Theme {uuid.uuid4().hex[:6]}: A synthetic collection for load tests.")
+
+
+class _Files:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def upload(self, file, config=None):
+        self._backend._call("files.upload")
+        if hasattr(file, "read"):
+            data = file.read()
+        else:
+            with open(file, "rb") as f:
+                data = f.read()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return self._backend._add_file(data)
+
+    def get(self, name):
+        self._backend._call("files.get")
+        if self._backend._file_bytes(name) is None:
+            raise FakeAPIError(404, "NOT_FOUND")
+        return SimpleNamespace(name=name, uri=f"{self._backend.download_base_url}/v1beta/{name}")
+
+    def download(self, file):
+        self._backend._call("files.download")
+        data = self._backend._file_bytes(getattr(file, "name", file))
+        if data is None:
+            raise FakeAPIError(404, "NOT_FOUND")
+        return data
+
+    def list(self):
+        self._backend._call("files.list")
+        with self._backend._lock:
+            names = list(self._backend._files)
+        return [SimpleNamespace(name=n, uri=f"{self._backend.download_base_url}/v1beta/{n}") for n in names]
+
+
+class _Batches:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, model, src, config=None):
+        self._backend._call("batches.create")
+        return self._backend._create_job(model, src)
+
+    def get(self, name):
+        self._backend._call("batches.get")
+        return self._backend._job_view(name)
+
+
+class FakeGeminiClient:
+    """Stand-in für `genai.Client` mit `models`, `files` und `batches`.
+
+    - `latency`: mittlere Verzögerung pro API-Aufruf in Sekunden (±50 % Jitter)
+    - `error_rate`: Anteil der Aufrufe, die mit 429/503 fehlschlagen
+    - `job_schedule`: Zustände und ihre Dauer, danach `JOB_STATE_SUCCEEDED`
+    - `job_failure_rate`: Anteil der Jobs, die am Ende `JOB_STATE_FAILED` melden
+    - `download_failure_rate`: Anteil der Downloads, die mittendrin abbrechen
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, job_schedule=(("JOB_STATE_PENDING", 1.0), ("JOB_STATE_RUNNING", 2.0)),
+                 job_failure_rate=0.0, download_failure_rate=0.0, image_size=64, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.job_schedule = job_schedule
+        self.job_failure_rate = job_failure_rate
+        self.download_failure_rate = download_failure_rate
+        self.image_size = image_size
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._files = {}
+        self._jobs = {}
+        self.calls = {}
+        self.models = _Models(self)
+        self.files = _Files(self)
+        self.batches = _Batches(self)
+        self._server = _ResultServer(self)
+        # Wird von batch_download statt der Google-URL verwendet
+        self.download_base_url = self._server.base_url
+
+    # --- intern ---
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def _call(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            delay = self.latency * self._random.uniform(0.5, 1.5) if self.latency else 0
+        if delay:
+            time.sleep(delay)
+        if self._roll(self.error_rate):
+            code = self._random.choice([429, 503])
+            raise FakeAPIError(code, "RESOURCE_EXHAUSTED" if code == 429 else "UNAVAILABLE",
+                               retry_after=1 if code == 429 else None)
+
+    def _add_file(self, data):
+        name = f"files/{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._files[name] = data
+        return SimpleNamespace(name=name, uri=f"{self.download_base_url}/v1beta/{name}", size_bytes=len(data))
+
+    def _file_bytes(self, name):
+        with self._lock:
+            return self._files.get(name)
+
+    def _create_job(self, model, src):
+        data = self._file_bytes(src)
+        if data is None:
+            raise FakeAPIError(400, "INVALID_ARGUMENT")
+        name = f"batches/{uuid.uuid4().hex[:12]}"
+        job = {
+            "name": name,
+            "model": model,
+            "src": src,
+            "created": time.time(),
+            "fails": self._roll(self.job_failure_rate),
+            "dest": None,
+        }
+        with self._lock:
+            self._jobs[name] = job
+        return self._job_view(name)
+
+    def _state(self, job):
+        elapsed = time.time() - job["created"]
+        for state, duration in self.job_schedule:
+            if elapsed < duration:
+                return state
+            elapsed -= duration
+        return "JOB_STATE_FAILED" if job["fails"] else "JOB_STATE_SUCCEEDED"
+
+    def _build_result(self, job):
+        lines = []
+        for i, line in enumerate(self._file_bytes(job["src"]).decode("utf-8").splitlines()):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            png = make_png(self.image_size, self.image_size, f"{job['name']}-{i}")
+            result = {
+                "response": {
+                    "candidates": [{
+                        "content": {"parts": [{"inlineData": {"mimeType": "image/png", "data": base64.b64encode(png).decode("ascii")}}], "role": "model"},
+                        "finishReason": "STOP",
+                    }]
+                }
+            }
+            if "key" in request:
+                result["key"] = request["key"]
+            lines.append(json.dumps(result))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _job_view(self, name):
+        with self._lock:
+            job = self._jobs.get(name)
+        if job is None:
+            raise FakeAPIError(404, "NOT_FOUND")
+        state = self._state(job)
+        if state == "JOB_STATE_SUCCEEDED":
+            with self._lock:
+                if job["dest"] is None:
+                    job["dest"] = self._add_file(self._build_result(job)).name
+        return SimpleNamespace(
+            name=name,
+            model=job["model"],
+            state=state,
+            dest=SimpleNamespace(file_name=job["dest"]) if job["dest"] else None,
+            error="Fake failure" if state == "JOB_STATE_FAILED" else None,
+        )
+
+    def close(self):
+        self._server.close()
@@ -0,0 +1,182 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+import job_store
+
+# --- KONFIGURATION ---
+HASH_SIZE = 8              # 8x8 Bits = 64-Bit dHash
+DUPLICATE_DISTANCE = 6     # max. Hamming-Abstand, ab dem zwei Bilder als Duplikat gelten
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hashes (
+    path     TEXT PRIMARY KEY,
+    job_id   TEXT,
+    dhash    INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_image_hashes_job ON image_hashes(job_id);
+"""
+
+
+def dhash(source, hash_size=HASH_SIZE):
+    """Difference-Hash eines Bildes (Pfad oder PIL-Image) als 64-Bit-Integer."""
+    image = Image.open(source) if not isinstance(source, Image.Image) else source
+    try:
+        # JPEGs gleich verkleinert dekodieren
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    finally:
+        if image is not source:
+            image.close()
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+# SQLite kennt nur vorzeichenbehaftete 64-Bit-Integer
+def _to_db(h):
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def _from_db(h):
+    return h + (1 << 64) if h < 0 else h
+
+
+class BKTree:
+    """BK-Baum über Hamming-Abstände: Nachbarsuche ohne alle Paare zu vergleichen."""
+
+    def __init__(self):
+        self.root = None   # [hash, [items], {abstand: kind}]
+        self.size = 0
+
+    def add(self, h, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [h, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [item], {}]
+                return
+            node = child
+
+    def query(self, h, max_distance=DUPLICATE_DISTANCE):
+        """Alle `(abstand, item)` mit Abstand <= `max_distance`, nächste zuerst."""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_distance:
+                results.extend((d, item) for item in node[1])
+            for child_d, child in node[2].items():
+                if d - max_distance <= child_d <= d + max_distance:
+                    stack.append(child)
+        results.sort(key=lambda r: r[0])
+        return results
+
+
+def _connect():
+    conn = job_store.connect()
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def index_images(paths, job_id=None):
+    """Berechnet die Hashes neuer/geänderter Bilder und speichert sie. Gibt {pfad: hash} zurück."""
+    conn = _connect()
+    hashes = {}
+    try:
+        known = {}
+        for path in paths:
+            row = conn.execute("SELECT dhash, mtime_ns FROM image_hashes WHERE path = ?", (path,)).fetchone()
+            if row:
+                known[path] = (row["dhash"], row["mtime_ns"])
+
+        rows = []
+        for path in paths:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if path in known and known[path][1] == mtime_ns:
+                hashes[path] = _from_db(known[path][0])
+                continue
+            try:
+                h = dhash(path)
+            except Exception:
+                continue
+            hashes[path] = h
+            rows.append((path, job_id, _to_db(h), mtime_ns))
+
+        if rows:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO image_hashes (path, job_id, dhash, mtime_ns) VALUES (?, ?, ?, ?)", rows
+                )
+    finally:
+        conn.close()
+    return hashes
+
+
+def index_version():
+    """(Anzahl, größte rowid) der Hash-Tabelle – ändert sich bei jedem neuen/aktualisierten Hash.
+
+    Damit lässt sich ein geladener BK-Baum cachen, bis neue Bilder dazukommen.
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT COUNT(*), MAX(rowid) FROM image_hashes").fetchone()
+    finally:
+        conn.close()
+    return tuple(row)
+
+
+def load_index():
+    """Baut einen BK-Baum über alle gespeicherten Hashes aller Jobs (Items: (pfad, job_id))."""
+    tree = BKTree()
+    conn = _connect()
+    try:
+        for row in conn.execute("SELECT path, job_id, dhash FROM image_hashes"):
+            tree.add(_from_db(row["dhash"]), (row["path"], row["job_id"]))
+    finally:
+        conn.close()
+    return tree
+
+
+def find_similar(path, tree=None, max_distance=DUPLICATE_DISTANCE):
+    """Ähnliche Bilder zu `path` in allen Jobs (ohne das Bild selbst)."""
+    h = index_images([path]).get(path)
+    if h is None:
+        return []
+    tree = tree or load_index()
+    return [(d, item) for d, item in tree.query(h, max_distance) if item[0] != path]
+
+
+def collapse_duplicates(paths, max_distance=DUPLICATE_DISTANCE, job_id=None):
+    """Behält von jeder Gruppe fast identischer Bilder nur das erste (Reihenfolge bleibt)."""
+    hashes = index_images(paths, job_id)
+    tree = BKTree()
+    unique = []
+    for path in paths:
+        h = hashes.get(path)
+        if h is None:
+            unique.append(path)
+            continue
+        if tree.size and tree.query(h, max_distance):
+            continue
+        tree.add(h, path)
+        unique.append(path)
+    return unique
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import sqlite3
+
+import job_store
+import metrics
+from batch_ingest import IMAGE_EXTENSIONS, job_folder_for
+from batch_submit import prompt_index
+
+# --- KONFIGURATION ---
+SEARCH_LIMIT = 200
+
+# Ein Eintrag pro Bild: woher es kommt (Job, Key, Prompt) und was es ist (Größe, Maße).
+# `manifest_fts` ist ein FTS5-Index über Prompt und Thema, den die Trigger aktuell halten.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_manifest (
+    path        TEXT PRIMARY KEY,
+    job_id      TEXT,
+    request_key TEXT,
+    line        INTEGER,
+    prompt      TEXT,
+    theme       TEXT,
+    bytes       INTEGER,
+    width       INTEGER,
+    height      INTEGER,
+    mtime_ns    INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_image_manifest_job ON image_manifest(job_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS manifest_fts USING fts5(
+    prompt, theme, content='image_manifest', tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS image_manifest_ai AFTER INSERT ON image_manifest BEGIN
+    INSERT INTO manifest_fts(rowid, prompt, theme) VALUES (new.rowid, new.prompt, new.theme);
+END;
+CREATE TRIGGER IF NOT EXISTS image_manifest_ad AFTER DELETE ON image_manifest BEGIN
+    INSERT INTO manifest_fts(manifest_fts, rowid, prompt, theme) VALUES ('delete', old.rowid, old.prompt, old.theme);
+END;
+CREATE TRIGGER IF NOT EXISTS image_manifest_au AFTER UPDATE ON image_manifest BEGIN
+    INSERT INTO manifest_fts(manifest_fts, rowid, prompt, theme) VALUES ('delete', old.rowid, old.prompt, old.theme);
+    INSERT INTO manifest_fts(rowid, prompt, theme) VALUES (new.rowid, new.prompt, new.theme);
+END;
+"""
+
+# UPSERT statt INSERT OR REPLACE: REPLACE löst keinen DELETE-Trigger aus, der FTS-Index bliebe stehen
+_UPSERT = """
+INSERT INTO image_manifest (path, job_id, request_key, line, prompt, theme, bytes, width, height, mtime_ns)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    job_id = excluded.job_id, request_key = excluded.request_key, line = excluded.line,
+    prompt = excluded.prompt, theme = excluded.theme, bytes = excluded.bytes,
+    width = excluded.width, height = excluded.height, mtime_ns = excluded.mtime_ns
+"""
+
+
+def _connect():
+    conn = job_store.connect()
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _image_size(path):
+    """Breite/Höhe aus dem Header (ohne das Bild zu dekodieren)."""
+    from PIL import Image
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def _journal_sources(conn, job_id):
+    """{pfad: (request_key, zeile)} aus dem Ingest-Journal des Jobs."""
+    try:
+        rows = conn.execute(
+            "SELECT line, request_key, files FROM ingest_journal WHERE job_id = ?", (job_id,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Journal-Tabelle gibt es erst nach dem ersten Ingest mit Journal
+        return {}
+    sources = {}
+    for row in rows:
+        for path in json.loads(row["files"] or "[]"):
+            sources[path] = (row["request_key"], row["line"])
+    return sources
+
+
+def index_job(job_id, paths=None):
+    """Trägt die Bilder eines Jobs ins Manifest ein; unveränderte Einträge bleiben stehen.
+
+    Key und Zeile kommen aus dem Ingest-Journal, der Prompt über den Key aus `job_prompts`.
+    Bilder ohne Key (ältere Jobs) werden nur mit Thema eingetragen, damit sie trotzdem
+    gefunden werden. Ohne `paths` werden alle Bilder im Job-Ordner genommen.
+    Gibt die Anzahl neu eingetragener/aktualisierter Bilder zurück.
+    """
+    job = job_store.get_job(job_id) or {}
+    prompts = job_store.get_prompts(job_id)
+    conn = _connect()
+    try:
+        sources = _journal_sources(conn, job_id)
+        if paths is None:
+            folder = job_folder_for(job_id)
+            paths = sorted(sources) + sorted(
+                os.path.join(folder, f) for f in (os.listdir(folder) if os.path.isdir(folder) else [])
+                if f.lower().endswith(IMAGE_EXTENSIONS) and os.path.join(folder, f) not in sources
+            )
+        known = {
+            row["path"]: (row["mtime_ns"], row["request_key"])
+            for row in conn.execute("SELECT path, mtime_ns, request_key FROM image_manifest WHERE job_id = ?", (job_id,))
+        }
+
+        rows = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key, line = sources.get(path, (None, None))
+            if known.get(path) == (stat.st_mtime_ns, key):
+                continue
+            index = prompt_index(key)
+            prompt = prompts[index] if index is not None and index < len(prompts) else None
+            width, height = _image_size(path)
+            rows.append((path, job_id, key, line, prompt, job.get("theme"), stat.st_size, width, height,
+                         stat.st_mtime_ns))
+
+        if rows:
+            with conn:
+                conn.executemany(_UPSERT, rows)
+    finally:
+        conn.close()
+    metrics.inc("manifest_rows_total", len(rows))
+    return len(rows)
+
+
+def index_all():
+    """Nachträglich alle Jobs der Datenbank ins Manifest aufnehmen. Gibt die Anzahl Einträge zurück."""
+    return sum(index_job(job["job_id"]) for job in job_store.list_jobs())
+
+
+def _fts_query(text):
+    """Freitext -> FTS5-Abfrage: jedes Wort als Präfix, alle Wörter müssen vorkommen."""
+    words = re.findall(r"\w+", text, flags=re.UNICODE)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(text, limit=SEARCH_LIMIT, job_id=None):
+    """Bilder, deren Prompt oder Thema zu `text` passt, bester Treffer zuerst.
+
+    Gibt Dicts mit path, job_id, request_key, prompt, theme, bytes, width, height zurück;
+    Einträge gelöschter Dateien werden dabei aus dem Manifest entfernt.
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+    sql = (
+        "SELECT m.path, m.job_id, m.request_key, m.prompt, m.theme, m.bytes, m.width, m.height "
+        "FROM manifest_fts JOIN image_manifest m ON m.rowid = manifest_fts.rowid "
+        "WHERE manifest_fts MATCH ?"
+    )
+    params = [query]
+    if job_id:
+        sql += " AND m.job_id = ?"
+        params.append(job_id)
+    sql += " ORDER BY bm25(manifest_fts) LIMIT ?"
+    params.append(limit)
+
+    conn = _connect()
+    try:
+        with metrics.span("search"):
+            rows = [dict(row) for row in conn.execute(sql, params)]
+        missing = [row["path"] for row in rows if not os.path.exists(row["path"])]
+        if missing:
+            with conn:
+                conn.executemany("DELETE FROM image_manifest WHERE path = ?", [(p,) for p in missing])
+    finally:
+        conn.close()
+    return [row for row in rows if row["path"] not in missing]
+
+
+def get_entry(path):
+    """Manifest-Eintrag eines Bildes oder None."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM image_manifest WHERE path = ?", (path,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+if __name__ == "__main__":
+    print(f"🗂️  {index_all()} Bilder ins Manifest eingetragen.")
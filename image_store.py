@@ -0,0 +1,57 @@
+import os
+import shutil
+import hashlib
+import threading
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+STORE_FOLDER = os.path.join(OUTPUT_FOLDER, ".store")
+
+
+def digest_bytes(data):
+    """SHA-256 des Bildinhalts (hex)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def store_path(digest, ext):
+    return os.path.join(STORE_FOLDER, digest[:2], f"{digest}{ext}")
+
+
+def store_bytes(data, ext, digest=None):
+    """Legt die Bytes genau einmal unter ihrem Digest ab und gibt den Store-Pfad zurück."""
+    digest = digest or digest_bytes(data)
+    path = store_path(digest, ext)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def link_into(src_path, dest_path):
+    """Verweist `dest_path` per Hardlink auf die Store-Datei (Fallback: Kopie).
+
+    Zeigt `dest_path` schon auf dieselbe Datei, passiert nichts. Gibt True zurück,
+    wenn tatsächlich etwas geschrieben wurde.
+    """
+    if os.path.exists(dest_path):
+        if os.path.samefile(src_path, dest_path):
+            return False
+        os.remove(dest_path)
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        # z.B. anderes Dateisystem oder keine Hardlinks möglich
+        shutil.copyfile(src_path, dest_path)
+    return True
+
+
+def put(data, dest_path, ext=None):
+    """Speichert `data` im Store und verlinkt sie nach `dest_path`. Gibt (store_pfad, geschrieben) zurück."""
+    ext = ext if ext is not None else os.path.splitext(dest_path)[1]
+    path = store_bytes(data, ext)
+    return path, link_into(path, dest_path)
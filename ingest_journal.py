@@ -0,0 +1,154 @@
+import os
+import json
+import time
+
+import job_store
+
+# --- KONFIGURATION ---
+COMMIT_EVERY = 50     # Journal-Einträge pro Transaktion (Absturz kostet höchstens so viele Zeilen)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_journal (
+    job_id      TEXT NOT NULL,
+    line        INTEGER NOT NULL,
+    request_key TEXT,
+    status      TEXT NOT NULL,
+    parts       INTEGER DEFAULT 0,
+    files       TEXT,
+    error       TEXT,
+    updated     REAL,
+    PRIMARY KEY (job_id, line)
+);
+"""
+
+# Zeilen in diesen Zuständen werden beim Fortsetzen übersprungen
+FINISHED_STATES = ("done", "empty")
+
+
+_initialized_paths = set()
+
+
+def _connect(db_path=None):
+    conn = job_store.connect(db_path)
+    path = os.path.abspath(db_path or job_store.DB_PATH)
+    if path not in _initialized_paths:
+        # CREATE ... IF NOT EXISTS: mehrfaches Ausführen bei gleichzeitigem Start schadet nicht
+        conn.executescript(_SCHEMA)
+        _initialized_paths.add(path)
+    return conn
+
+
+class IngestJournal:
+    """Merkt sich pro Job, welche Ergebniszeilen schon gespeichert sind und welche mit welchem Fehler scheiterten.
+
+    Eine Zeile gilt als `done`, wenn alle ihre Bilder geschrieben wurden; `empty`, wenn sie
+    keine Bilder enthält (z.B. blockierter Prompt); sonst `failed` mit Grund. Beim nächsten
+    Ingest desselben Jobs werden fertige Zeilen übersprungen (sofern ihre Dateien noch da sind).
+    Nur aus dem Thread benutzen, der das Journal angelegt hat.
+    """
+
+    def __init__(self, job_id, db_path=None):
+        self.job_id = job_id
+        self._conn = _connect(db_path)
+        self._pending = []
+        self.finished = {}   # Zeile -> (Dateien, Anzahl Bild-Teile)
+        for row in self._conn.execute(
+            "SELECT line, status, parts, files FROM ingest_journal WHERE job_id = ?", (job_id,)
+        ):
+            if row["status"] in FINISHED_STATES:
+                files = json.loads(row["files"]) if row["files"] else []
+                if all(os.path.exists(f) for f in files):
+                    self.finished[row["line"]] = (files, row["parts"])
+
+    def skip(self, line):
+        """`(Dateien, Teile)` einer schon fertigen Zeile oder None, wenn sie (erneut) verarbeitet werden muss."""
+        return self.finished.get(line)
+
+    def record(self, line, files, parts, errors=(), key=None, reason=None):
+        """Ergebnis einer Zeile eintragen; `errors` sind die Fehlermeldungen einzelner Bilder."""
+        if errors:
+            status, error = "failed", "; ".join(errors)
+        elif not parts:
+            status, error = "empty", reason
+        else:
+            status, error = "done", None
+        self._pending.append((self.job_id, line, key, status, parts, json.dumps(files), error, time.time()))
+        if status in FINISHED_STATES:
+            self.finished[line] = (list(files), parts)
+        if len(self._pending) >= COMMIT_EVERY:
+            self.flush()
+
+    def fail(self, line, reason, key=None):
+        """Ganze Zeile gescheitert (z.B. kaputtes JSON)."""
+        self._pending.append((self.job_id, line, key, "failed", 0, "[]", reason, time.time()))
+        if len(self._pending) >= COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ingest_journal "
+                "(job_id, line, request_key, status, parts, files, error, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Auch bei einem Absturz festhalten, was bis dahin geschafft wurde
+        self.close()
+
+
+def summary(job_id, db_path=None):
+    """Anzahl Zeilen pro Status, z.B. `{"done": 98, "failed": 2}`."""
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS n FROM ingest_journal WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["status"]: row["n"] for row in rows}
+
+
+def failed_counts(db_path=None):
+    """Anzahl gescheiterter Zeilen pro Job für alle Jobs in einer Abfrage, z.B. `{"batches/abc": 2}`."""
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT job_id, COUNT(*) AS n FROM ingest_journal WHERE status = 'failed' GROUP BY job_id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["job_id"]: row["n"] for row in rows}
+
+
+def failures(job_id, db_path=None):
+    """Gescheiterte Zeilen als Liste von Dicts (line, request_key, error)."""
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT line, request_key, error FROM ingest_journal WHERE job_id = ? AND status = 'failed' ORDER BY line",
+            (job_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def reset(job_id, db_path=None):
+    """Vergisst das Journal eines Jobs (nächster Ingest verarbeitet wieder alles)."""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM ingest_journal WHERE job_id = ?", (job_id,))
+    finally:
+        conn.close()
@@ -0,0 +1,206 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import job_store
+import metrics
+import ingest_journal
+
+# Download, Ingest, Vorschaubilder und Hashes (requests, numpy, PIL) werden erst
+# importiert, wenn ein Job wirklich fertig ist – der Poller selbst startet schnell.
+
+# --- KONFIGURATION ---
+MIN_POLL_INTERVAL = 30      # Sekunden bis zur ersten Wiederholung
+MAX_POLL_INTERVAL = 600     # Obergrenze für das Backoff pro Job
+MAX_PARALLEL_CHECKS = 4
+
+FAILED_STATES = ("JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED")
+IN_PROGRESS = "IN_PROGRESS"   # Rückgabe von check_and_ingest, wenn ein anderer den Job gerade lädt
+
+
+def state_name(state):
+    """`JobState`-Enum oder String -> 'JOB_STATE_...'."""
+    return getattr(state, "value", None) or str(state)
+
+
+def after_ingest(job_id, images, record=None):
+    """Vorschaubilder, Bild-Hashes und Manifest direkt nach dem Ingest erzeugen (Fehler sind nicht kritisch)."""
+    import image_hash
+    import image_manifest
+    from thumbnails import warm_thumbnails
+    try:
+        with metrics.span("thumbnails", record):
+            warm_thumbnails(images)
+    except Exception:
+        pass
+    try:
+        with metrics.span("hashes", record):
+            image_hash.index_images(images, job_id)
+    except Exception:
+        pass
+    try:
+        with metrics.span("manifest", record):
+            image_manifest.index_job(job_id, images)
+    except Exception:
+        pass
+
+
+def queue_time(job_id):
+    """Zeit vom Einreichen bis zum erkannten Ende des Jobs als Start des Zeitprofils."""
+    job = job_store.get_job(job_id)
+    if not job or not job.get("timestamp"):
+        return {}
+    waited = time.time() - job["timestamp"]
+    metrics.observe("queue", waited)
+    return {"queue": round(waited, 1)}
+
+
+def check_and_ingest(client, api_key, job_id, ingest_workers=1, validate=False, use_processes=None):
+    """Prüft einen Job und lädt/speichert die Bilder, sobald er fertig ist.
+
+    Gibt den neuen lokalen Status zurück ('COMPLETED', 'FAILED'), None, wenn er noch läuft,
+    oder `IN_PROGRESS`, wenn ein anderer Thread/Prozess ihn gerade herunterlädt.
+    Download und Ingest laufen unter `job_store.claim_job`, damit Poller, Button und CLI
+    sich nicht dieselbe `.part`-Datei und denselben Job-Ordner teilen.
+    Das Zeitprofil (queue, download, ingest, thumbnails, hashes) wird beim Job gespeichert.
+    Scheitern einzelne Zeilen, bleibt die Ergebnisdatei liegen und ein erneuter Aufruf
+    verarbeitet laut Ingest-Journal nur noch diese Zeilen.
+    """
+    with metrics.span("status_check"):
+        api_job = client.batches.get(name=job_id)
+    state = state_name(api_job.state)
+
+    if state == "JOB_STATE_SUCCEEDED":
+        if not job_store.claim_job(job_id):
+            return IN_PROGRESS
+        try:
+            return _download_and_ingest(client, api_key, job_id, api_job, ingest_workers, validate, use_processes)
+        finally:
+            job_store.release_job(job_id)
+
+    if state in FAILED_STATES:
+        job_store.update_job(job_id, status="FAILED")
+        job_store.record_timings(job_id, queue_time(job_id))
+        metrics.inc("jobs_failed_total")
+        return "FAILED"
+
+    return None
+
+
+def _download_and_ingest(client, api_key, job_id, api_job, ingest_workers, validate, use_processes):
+    from batch_download import fetch_result_file
+    from batch_ingest import process_downloaded_content
+
+    job = job_store.get_job(job_id)
+    if job and job["status"] == "COMPLETED" and not ingest_journal.failures(job_id):
+        # Wer vorher den Claim hatte, ist schon fertig geworden
+        return "COMPLETED"
+
+    record = queue_time(job_id)
+    with metrics.span("download", record):
+        result_path = fetch_result_file(client, api_key, api_job.dest.file_name)
+    with metrics.span("ingest", record):
+        images = process_downloaded_content(result_path, job_id, workers=ingest_workers, validate=validate,
+                                            use_processes=use_processes)
+    job_store.update_job(job_id, status="COMPLETED", image_count=len(images))
+    failed = ingest_journal.failures(job_id)
+    if failed:
+        # Ergebnisdatei behalten: der nächste Versuch wiederholt nur diese Zeilen
+        metrics.inc("ingest_failed_lines_total", len(failed))
+    else:
+        os.remove(result_path)
+    after_ingest(job_id, images, record)
+    job_store.record_timings(job_id, record)
+    metrics.inc("jobs_completed_total")
+    return "COMPLETED"
+
+
+class JobPoller:
+    """Prüft alle Jobs im Status SUBMITTED parallel, mit eigenem Backoff pro Job."""
+
+    def __init__(self, client, api_key, max_workers=MAX_PARALLEL_CHECKS, ingest_workers=1, ingest_processes=None,
+                 min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL, log=print):
+        self.client = client
+        self.api_key = api_key
+        self.max_workers = max_workers
+        self.ingest_workers = ingest_workers
+        self.ingest_processes = ingest_processes
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.log = log
+        self._schedule = {}   # job_id -> (nächste Prüfung, aktuelles Intervall)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+
+    def _due_jobs(self, now):
+        pending = [job["job_id"] for job in job_store.list_jobs(status="SUBMITTED")]
+        with self._lock:
+            # Nicht mehr offene Jobs vergessen
+            for job_id in list(self._schedule):
+                if job_id not in pending:
+                    del self._schedule[job_id]
+            return [j for j in pending if self._schedule.get(j, (0, 0))[0] <= now]
+
+    def _backoff(self, job_id):
+        with self._lock:
+            _, interval = self._schedule.get(job_id, (0, 0))
+            interval = min(max(interval * 2, self.min_interval), self.max_interval)
+            # Etwas Jitter, damit nicht alle Jobs gleichzeitig abgefragt werden
+            self._schedule[job_id] = (time.time() + interval * random.uniform(0.8, 1.2), interval)
+
+    def _check(self, job_id):
+        try:
+            result = check_and_ingest(self.client, self.api_key, job_id, self.ingest_workers,
+                                      use_processes=self.ingest_processes)
+        except Exception as e:
+            self.log(f"⚠️  {job_id}: {e}")
+            result = None
+        if result in (None, IN_PROGRESS):
+            self._backoff(job_id)
+        else:
+            self.log(f"✅ {job_id}: {result}")
+            with self._lock:
+                self._schedule.pop(job_id, None)
+        return job_id, result
+
+    def poll_once(self):
+        """Eine Runde: alle fälligen Jobs gleichzeitig prüfen. Gibt {job_id: Status} zurück."""
+        due = self._due_jobs(time.time())
+        self.last_run = time.time()
+        if not due:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(executor.map(self._check, due))
+        metrics.write_metrics()
+        return results
+
+    def pending_count(self):
+        return len(job_store.list_jobs(status="SUBMITTED"))
+
+    def run(self, tick=5, until_done=False):
+        """Pollt in einer Schleife, bis `stop()` gerufen wird (oder keine Jobs mehr offen sind)."""
+        while not self._stop.is_set():
+            self.poll_once()
+            if until_done and not self.pending_count():
+                break
+            self._stop.wait(tick)
+
+    def start(self, tick=5):
+        """Startet den Poller als Hintergrund-Thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, kwargs={"tick": tick}, daemon=True, name="job-poller")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
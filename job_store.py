@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+DB_PATH = os.path.join(OUTPUT_FOLDER, "jobs.sqlite3")
+CLAIM_TIMEOUT = 3600     # Sekunden, nach denen ein Claim als verwaist gilt (abgestürzter Prozess)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    theme       TEXT,
+    timestamp   REAL,
+    status      TEXT,
+    image_count INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_timestamp ON jobs(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+
+CREATE TABLE IF NOT EXISTS job_prompts (
+    job_id TEXT NOT NULL,
+    idx    INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+JOB_COLUMNS = ("job_id", "theme", "timestamp", "status", "image_count", "collection_id", "model", "variant",
+               "claimed_until")
+
+# Spalten, die nach der ersten Version dazugekommen sind (Name, Typ)
+_ADDED_COLUMNS = [
+    ("collection_id", "TEXT"),
+    ("timings", "TEXT"),        # JSON: Sekunden pro Stufe (theme, prompts, upload, queue, download, ...)
+    ("model", "TEXT"),
+    ("variant", "TEXT"),        # z.B. "gemini-3-pro-image-preview 3:4" bei aufgefächerten Kollektionen
+    ("claimed_until", "REAL"),  # gesetzt, solange ein Poller/Button/CLI den Job herunterlädt
+]
+
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+
+def connect(db_path=None):
+    """Öffnet die Job-Datenbank (WAL-Modus) und legt sie beim ersten Mal an."""
+    db_path = db_path or DB_PATH
+    folder = os.path.dirname(db_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if db_path not in _initialized_paths:
+        # Mehrere Threads öffnen die Datenbank evtl. gleichzeitig zum ersten Mal
+        with _init_lock:
+            if db_path not in _initialized_paths:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _migrate(conn)
+                import_json_jobs(conn, folder or ".")
+                _initialized_paths.add(db_path)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _migrate(conn):
+    """Ergänzt fehlende Spalten in älteren Datenbanken.
+
+    Prüfung und `ALTER TABLE` laufen in einer `BEGIN IMMEDIATE`-Transaktion: aktualisieren
+    zwei Prozesse (App und CLI) gleichzeitig eine alte Datenbank, wartet der zweite und
+    sieht danach die neuen Spalten schon.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, column_type in _ADDED_COLUMNS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_collection ON jobs(collection_id)")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def import_json_jobs(conn, folder=OUTPUT_FOLDER):
+    """Einmaliger Import der alten `batch_job_*.json`-Dateien in die Datenbank."""
+    done = conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+    if done:
+        return 0
+
+    imported = 0
+    files = [f for f in os.listdir(folder) if f.startswith("batch_job_") and f.endswith(".json")]
+    with conn:
+        for f in files:
+            path = os.path.join(folder, f)
+            try:
+                with open(path, "r") as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if "job_id" not in data:
+                continue
+            _insert_job(
+                conn, data["job_id"], data.get("theme", "Unbekannt"), data.get("prompts", []),
+                status=data.get("status", "SUBMITTED"),
+                timestamp=data.get("timestamp", os.path.getmtime(path)),
+                image_count=data.get("image_count", 0),
+            )
+            imported += 1
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)", (str(time.time()),))
+    return imported
+
+
+def _insert_job(conn, job_id, theme, prompts, status="SUBMITTED", timestamp=None, image_count=0,
+                collection_id=None, model=None, variant=None):
+    conn.execute(
+        "INSERT OR IGNORE INTO jobs (job_id, theme, timestamp, status, image_count, collection_id, model, variant) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job_id, theme, timestamp or time.time(), status, image_count, collection_id, model, variant),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO job_prompts (job_id, idx, prompt) VALUES (?, ?, ?)",
+        [(job_id, idx, prompt) for idx, prompt in enumerate(prompts)],
+    )
+
+
+def save_job(job_id, theme, prompts, status="SUBMITTED", timestamp=None, collection_id=None, model=None,
+             variant=None, db_path=None):
+    """Legt einen neuen Job samt Prompts an (eine Transaktion).
+
+    Jobs derselben Kollektion (aufgeteilte große Batches, Modell-/Format-Varianten)
+    teilen sich eine `collection_id`.
+    """
+    conn = connect(db_path)
+    try:
+        with conn:
+            _insert_job(conn, job_id, theme, prompts, status=status, timestamp=timestamp,
+                        collection_id=collection_id, model=model, variant=variant)
+    finally:
+        conn.close()
+    return job_id
+
+
+def list_jobs(status=None, db_path=None):
+    """Alle Jobs ohne Prompts, neueste zuerst (über den Index sortiert).
+
+    `timings` ist schon als Dict dabei, damit der Verlauf nicht pro Job nachfragen muss.
+    """
+    conn = connect(db_path)
+    try:
+        columns = ", ".join(JOB_COLUMNS + ("timings",))
+        if status:
+            rows = conn.execute(
+                f"SELECT {columns} FROM jobs WHERE status = ? ORDER BY timestamp DESC", (status,)
+            ).fetchall()
+        else:
+            rows = conn.execute(f"SELECT {columns} FROM jobs ORDER BY timestamp DESC").fetchall()
+    finally:
+        conn.close()
+    jobs = [dict(row) for row in rows]
+    for job in jobs:
+        job["timings"] = json.loads(job["timings"]) if job["timings"] else {}
+    return jobs
+
+
+def list_collection(collection_id, db_path=None):
+    """Alle Jobs einer Kollektion."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE collection_id = ? ORDER BY job_id",
+            (collection_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def list_collections(db_path=None):
+    """Eine Zeile pro Kollektion: Thema, Anzahl Jobs, fertige/fehlgeschlagene Jobs, Bilder, neueste zuerst."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT collection_id, MIN(theme) AS theme, MAX(timestamp) AS timestamp, COUNT(*) AS jobs, "
+            "SUM(status = 'COMPLETED') AS completed, SUM(status = 'FAILED') AS failed, "
+            "SUM(COALESCE(image_count, 0)) AS image_count "
+            "FROM jobs WHERE collection_id IS NOT NULL GROUP BY collection_id ORDER BY timestamp DESC"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def get_job(job_id, db_path=None):
+    conn = connect(db_path)
+    try:
+        row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def latest_job(db_path=None):
+    """Der zuletzt angelegte Job (oder None)."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY timestamp DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def get_prompts(job_id, db_path=None):
+    """Lädt die Prompts eines Jobs erst bei Bedarf."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT prompt FROM job_prompts WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row["prompt"] for row in rows]
+
+
+def update_job(job_id, db_path=None, **fields):
+    """Aktualisiert einzelne Spalten eines Jobs atomar, z.B. `status` und `image_count`."""
+    fields = {k: v for k, v in fields.items() if k in JOB_COLUMNS and k != "job_id"}
+    if not fields:
+        return
+    assignments = ", ".join(f"{k} = ?" for k in fields)
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+
+def record_timings(job_id, stages, db_path=None):
+    """Ergänzt das Zeitprofil eines Jobs (`{stufe: sekunden}`); vorhandene Stufen werden überschrieben."""
+    if not stages:
+        return
+    conn = connect(db_path)
+    try:
+        with conn:
+            row = conn.execute("SELECT timings FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            timings = json.loads(row["timings"]) if row["timings"] else {}
+            timings.update(stages)
+            conn.execute("UPDATE jobs SET timings = ? WHERE job_id = ?", (json.dumps(timings), job_id))
+    finally:
+        conn.close()
+
+
+def get_timings(job_id, db_path=None):
+    """Zeitprofil eines Jobs als Dict (leer, wenn noch nichts gemessen wurde)."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT timings FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row["timings"]) if row and row["timings"] else {}
+
+
+def claim_job(job_id, timeout=CLAIM_TIMEOUT, db_path=None):
+    """Reserviert einen Job für Download und Ingest (atomar, auch über Prozesse hinweg).
+
+    Gibt False zurück, wenn ihn gerade jemand anderes bearbeitet. Jobs, die nicht in der
+    Datenbank stehen, lassen sich nicht koordinieren und gelten als frei.
+    """
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        with conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET claimed_until = ? WHERE job_id = ? AND (claimed_until IS NULL OR claimed_until < ?)",
+                (now + timeout, job_id, now)
+            ).rowcount
+            if claimed:
+                return True
+            return conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is None
+    finally:
+        conn.close()
+
+
+def release_job(job_id, db_path=None):
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("UPDATE jobs SET claimed_until = NULL WHERE job_id = ?", (job_id,))
+    finally:
+        conn.close()
+
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, ".llm_cache")
+CACHE_TTL = 7 * 24 * 3600              # Sekunden, danach wird neu generiert
+MAX_CACHE_BYTES = 20 * 1024 * 1024     # älteste Einträge fliegen zuerst raus
+
+
+def cache_key(model, prompt, count=None):
+    """Schlüssel aus Modell, vollständigem Prompt-Text und Anzahl."""
+    raw = json.dumps([model, prompt, count], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_FOLDER, f"{key}.json")
+
+
+def get(key, ttl=CACHE_TTL):
+    """Gibt den gecachten Wert zurück oder None (fehlt / abgelaufen / kaputt)."""
+    path = _entry_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["value"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def put(key, value, max_bytes=MAX_CACHE_BYTES):
+    """Speichert einen Wert atomar und räumt danach bei Bedarf auf.
+
+    Ein Cache-Fehler darf den (schon bezahlten) LLM-Aufruf nicht scheitern lassen:
+    bei OSError wird nur nichts gespeichert. Gibt zurück, ob der Eintrag geschrieben wurde.
+    """
+    path = _entry_path(key)
+    # Eindeutig pro Prozess und Thread: Streamlit-Sessions teilen sich einen Prozess
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    evict(max_bytes)
+    return True
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """Löscht die ältesten Einträge, bis der Cache unter `max_bytes` liegt."""
+    if not os.path.exists(CACHE_FOLDER):
+        return
+    entries = []
+    total = 0
+    for name in os.listdir(CACHE_FOLDER):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_FOLDER, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def cached_call(model, prompt, compute, count=None, refresh=False, ttl=CACHE_TTL):
+    """Liefert `compute()` aus dem Cache; mit `refresh=True` wird immer neu berechnet."""
+    key = cache_key(model, prompt, count)
+    if not refresh:
+        value = get(key, ttl)
+        if value is not None:
+            return value
+    value = compute()
+    if value:
+        put(key, value)
+    return value
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# --- KONFIGURATION ---
+# Optionaler Export, z.B. "NanoBilder_Batch/metrics.prom" (Prometheus-Textformat) oder ".json"
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRIC_PREFIX = "nanobilder"
+# Obergrenzen der Latenz-Buckets in Sekunden (von Einzelbild bis Warteschlange)
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600, 14400, 86400)
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> Wert
+_histograms = {}   # stage -> {"counts": [...], "sum": float, "count": int}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Erhöht einen Zähler, z.B. `inc("images_ingested_total", 12)`."""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(stage, seconds):
+    """Trägt eine Dauer in das Latenz-Histogramm der Stufe ein."""
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = {"counts": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["counts"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+
+
+@contextmanager
+def span(stage, record=None):
+    """Misst einen Abschnitt: Histogramm `stage`, bei Exceptions zusätzlich `failures_total{stage}`.
+
+    Ist `record` ein Dict, wird die Dauer dort unter `stage` aufsummiert (Zeitprofil eines Jobs).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        inc("failures_total", stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(stage, elapsed)
+        if record is not None:
+            record[stage] = round(record.get(stage, 0) + elapsed, 4)
+
+
+def snapshot():
+    """Aktueller Stand aller Zähler und Histogramme als JSON-taugliches Dict."""
+    with _lock:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        histograms = {
+            stage: {
+                "buckets": dict(zip((str(b) for b in BUCKETS), hist["counts"])),
+                "sum": round(hist["sum"], 6),
+                "count": hist["count"],
+            }
+            for stage, hist in sorted(_histograms.items())
+        }
+    return {"timestamp": time.time(), "counters": counters, "stage_seconds": histograms}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def prometheus_text():
+    """Alle Metriken im Prometheus-Textformat (z.B. für den node_exporter-Textfile-Collector)."""
+    lines = []
+    with _lock:
+        seen = set()
+        for (name, labels), value in sorted(_counters.items()):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if full_name not in seen:
+                lines.append(f"# TYPE {full_name} counter")
+                seen.add(full_name)
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+        hist_name = f"{METRIC_PREFIX}_stage_seconds"
+        if _histograms:
+            lines.append(f"# TYPE {hist_name} histogram")
+        for stage, hist in sorted(_histograms.items()):
+            for bound, count in zip(BUCKETS, hist["counts"]):
+                lines.append(f'{hist_name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{hist_name}_bucket{{stage="{stage}",le="+Inf"}} {hist["count"]}')
+            lines.append(f'{hist_name}_sum{{stage="{stage}"}} {hist["sum"]:.6f}')
+            lines.append(f'{hist_name}_count{{stage="{stage}"}} {hist["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=None):
+    """Schreibt die Metriken nach `path` bzw. `METRICS_FILE` (.json -> JSON, sonst Prometheus).
+
+    Ohne konfigurierte Datei passiert nichts. Gibt den Pfad zurück (oder None).
+    """
+    path = path or METRICS_FILE
+    if not path:
+        return None
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if path.endswith(".json"):
+        content = json.dumps(snapshot(), indent=4)
+    else:
+        content = prometheus_text()
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def reset():
+    """Vergisst alle Werte (z.B. zwischen Benchmark-Läufen)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
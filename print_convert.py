@@ -0,0 +1,195 @@
+import os
+import zipfile
+from io import BytesIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+import metrics
+
+# --- KONFIGURATION ---
+PRINT_DPI = 300
+
+# Papierformate bei 300 DPI (Breite, Höhe in Pixeln)
+PAPER_PRESETS = {
+    "A4": (2480, 3508),
+    "A5": (1748, 2480),
+    "Letter": (2550, 3300),
+    "12x12": (3600, 3600),
+}
+
+PAPER_LABELS = {
+    "A4": "DIN A4 (210 × 297 mm)",
+    "A5": "DIN A5 (148 × 210 mm)",
+    "Letter": "US Letter (8.5 × 11\")",
+    "12x12": "Scrapbook 12 × 12\"",
+}
+
+
+def crop_box_for(width, height, target_width, target_height):
+    """Mittiger Ausschnitt im Quellbild, der exakt das Seitenverhältnis des Ziels hat."""
+    target_ratio = target_width / target_height
+    img_ratio = width / height
+
+    if img_ratio > target_ratio:
+        # Bild ist breiter -> links/rechts abschneiden
+        crop_width = height * target_ratio
+        left = (width - crop_width) / 2
+        return (left, 0, left + crop_width, height)
+    # Bild ist schmaler -> oben/unten abschneiden
+    crop_height = width / target_ratio
+    top = (height - crop_height) / 2
+    return (0, top, width, top + crop_height)
+
+
+def convert_to_paper(image, preset="A4"):
+    """Skaliert und schneidet ein Bild mittels Lanczos-Filter auf ein Papierformat zu.
+
+    Es wird zuerst zugeschnitten und nur der sichtbare Ausschnitt neu berechnet
+    (`resize(box=...)`), statt das ganze Bild zu skalieren und danach Pixel wegzuwerfen.
+    """
+    target_width, target_height = PAPER_PRESETS[preset]
+    box = crop_box_for(image.width, image.height, target_width, target_height)
+    return image.resize((target_width, target_height), Image.Resampling.LANCZOS, box=box)
+
+
+def convert_to_a4(image):
+    """Konvertiert ein Bild zu DIN A4 (300 DPI) mittels Lanczos-Filter."""
+    return convert_to_paper(image, "A4")
+
+
+JPEG_EXTENSIONS = (".jpg", ".jpeg")
+
+
+def output_name(name, preset="A4"):
+    """Dateiname der Seite; die Endung passt zum geschriebenen Format (JPEG bleibt JPEG, alles andere wird PNG)."""
+    base = os.path.basename(name)
+    stem, ext = os.path.splitext(base)
+    if ext.lower() not in JPEG_EXTENSIONS:
+        base = stem + ".png"
+    return f"{preset}_{base}"
+
+
+def _encode_page(image, name):
+    """Speichert eine fertige Seite mit DPI-Angabe; JPEG behält Qualität 95, sonst PNG."""
+    buffer = BytesIO()
+    if name.lower().endswith(JPEG_EXTENSIONS):
+        image.convert("RGB").save(buffer, "JPEG", quality=95, dpi=(PRINT_DPI, PRINT_DPI))
+    else:
+        image.save(buffer, "PNG", dpi=(PRINT_DPI, PRINT_DPI))
+    return buffer.getvalue()
+
+
+def convert_page(name, source, preset="A4"):
+    """Worker: lädt ein Bild (Pfad oder Bytes), konvertiert es und gibt (Dateiname, Bytes) zurück."""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    with Image.open(source) as image:
+        page = convert_to_paper(image, preset)
+    arcname = output_name(name, preset)
+    return arcname, _encode_page(page, arcname)
+
+
+def _iter_bounded(executor, func, arg_tuples, workers):
+    """`executor.submit` für alle Argumente, Ergebnisse in Eingabereihenfolge, max. `2 * workers` offen."""
+    pending = deque()
+    for args in arg_tuples:
+        pending.append(executor.submit(func, *args))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_converted_pages(sources, preset="A4", workers=None):
+    """Konvertiert `(name, pfad_oder_bytes)`-Paare in einem Prozess-Pool.
+
+    Liefert `(Dateiname, Bytes)` in Eingabereihenfolge, sobald eine Seite fertig ist.
+    Es sind höchstens `2 * workers` Bilder gleichzeitig unterwegs.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _iter_bounded(executor, convert_page,
+                                 ((name, source, preset) for name, source in sources), workers)
+
+
+def convert_file(source_path, dest_path, preset="A4"):
+    """Worker: konvertiert eine Bilddatei und schreibt die Seite direkt nach `dest_path`."""
+    arcname, data = convert_page(os.path.basename(source_path), source_path, preset)
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def print_folder_for(job_folder, preset="A4"):
+    """Zielordner der Druckseiten neben den Originalen: `<job>/<preset>/`."""
+    return os.path.join(job_folder, preset)
+
+
+def process_into_folder(worker, paths, out_folder, dest_name, args=(), stage="process", workers=None,
+                        progress=None):
+    """Lässt `worker(quelle, ziel, *args)` in einem Prozess-Pool über Dateien laufen, die auf dem Server liegen.
+
+    Ziel jeder Datei ist `<out_folder>/<dest_name(quelle)>`; Ziele, die neuer als ihre
+    Quelle sind, werden übersprungen. Die Worker lesen und schreiben selbst – es wandern
+    nur Pfade zwischen den Prozessen. `progress(done, total)` nach jeder Datei.
+    Gibt `(alle Zielpfade in Eingabereihenfolge, Rückgaben der neu bearbeiteten Dateien)` zurück.
+    """
+    os.makedirs(out_folder, exist_ok=True)
+
+    outputs = []
+    todo = []
+    for path in paths:
+        dest = os.path.join(out_folder, dest_name(path))
+        outputs.append(dest)
+        if not (os.path.exists(dest) and os.path.getmtime(dest) >= os.path.getmtime(path)):
+            todo.append((path, dest, *args))
+
+    total = len(outputs)
+    done = total - len(todo)
+    if progress:
+        progress(done, total)
+    results = []
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        with metrics.span(stage), ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in _iter_bounded(executor, worker, todo, workers):
+                results.append(result)
+                done += 1
+                if progress:
+                    progress(done, total)
+    return outputs, results
+
+
+def convert_job_images(paths, job_folder, preset="A4", workers=None, progress=None):
+    """Konvertiert Bilder, die schon auf dem Server liegen, nach `<job>/<preset>/`.
+
+    Seiten, die neuer als ihr Original sind, werden nicht neu berechnet.
+    `progress(done, total)` nach jeder Seite. Gibt die Pfade aller Seiten (in Eingabereihenfolge) zurück.
+    """
+    pages, converted = process_into_folder(
+        convert_file, paths, print_folder_for(job_folder, preset), lambda path: output_name(path, preset),
+        args=(preset,), stage="print_convert", workers=workers, progress=progress
+    )
+    if converted:
+        metrics.inc("pages_converted_total", len(converted), preset=preset)
+    return pages
+
+
+def convert_batch_to_zip(sources, output, preset="A4", workers=None, progress=None):
+    """Konvertiert alle Bilder parallel und schreibt sie direkt ins ZIP (`output`: Pfad oder Datei).
+
+    `progress(done)` wird nach jeder fertigen Seite aufgerufen. Gibt die Anzahl der Seiten zurück.
+    """
+    done = 0
+    with metrics.span("print_convert"), zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as zf:
+        for arcname, data in iter_converted_pages(sources, preset, workers):
+            zf.writestr(arcname, data)
+            done += 1
+            if progress:
+                progress(done)
+    metrics.inc("pages_converted_total", done, preset=preset)
+    return done
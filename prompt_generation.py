@@ -0,0 +1,185 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_cache
+import metrics
+
+# --- KONFIGURATION ---
+TEXT_MODEL = 'gemini-2.0-flash-exp'
+SHARD_SIZE = 25                 # Prompts pro Teil-Anfrage
+MAX_PARALLEL_SHARDS = 4
+MAX_ROUNDS = 3                  # Nachforderungen, falls Prompts fehlen
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Jaccard-Ähnlichkeit der Wortmengen
+
+# Jede Teil-Anfrage bekommt einen Schwerpunkt, damit sich die Shards weniger überschneiden
+SHARD_FOCUS = [
+    "Full page patterns (seamless or distressed)",
+    "Collage-style compositions (ephemera, torn paper, stamps)",
+    "Focal point artistic illustrations with textured backgrounds",
+    "Macro textures (aged paper, fabric, lace)",
+]
+
+
+def build_theme_request(user_input=None):
+    """Baut die Anweisung für Gemini, ein Kollektions-Thema zu entwickeln."""
+    base_instruction = "You are a creative director for a digital art shop on Etsy selling 'Junk Journal' background papers."
+    
+    if user_input and user_input.strip():
+        return f"""{base_instruction}
+The user has suggested: "{user_input}".
+Based on this, define a specific, catchy, and commercially viable 'Collection Theme' name and a brief description.
+Output ONLY the Theme Name and Description in one line.
+Example: 'Vintage Beekeeper: A nostalgic collection of honeycomb patterns, vintage bee illustrations, and aged paper textures.'"""
+    return f"""{base_instruction}
+Brainstorm a unique, high-potential, and specific 'Collection Theme' for a new set of background papers.
+It should be distinct from generic themes. Think about niches like 'Steampunk Alice in Wonderland', 'Dark Academia Botany', 'Celestial Navigation', 'Victorian Gothic', 'Cottagecore Herbarium'.
+Output ONLY the Theme Name and Description in one line."""
+
+
+def generate_theme(client, user_input=None, refresh=False):
+    """Lässt Gemini ein Thema entwickeln; gleiche Idee -> Antwort aus dem Cache.
+
+    Ohne Idee (zufälliges Thema) wird nie gecacht, sonst käme immer dasselbe Thema.
+    """
+    prompt = build_theme_request(user_input)
+
+    def compute():
+        with metrics.span("llm_theme"):
+            response = client.models.generate_content(model=TEXT_MODEL, contents=prompt)
+        return response.text.strip()
+
+    if not (user_input and user_input.strip()):
+        return compute()
+    return llm_cache.cached_call(TEXT_MODEL, prompt, compute, refresh=refresh)
+
+
+def build_prompt_request(theme, count, focus=None, avoid=None):
+    """Baut die Anweisung für Gemini, `count` Bild-Prompts zum Thema zu schreiben."""
+    generation_prompt = f"""Act as an expert AI art prompter.
+Target Audience: Etsy customers looking for "Junk Journal Background Pages".
+Collection Theme: "{theme}"
+
+Task: Generate {count} HIGHLY DETAILED and UNIQUE image generation prompts for this collection.
+
+Requirements:
+1. **Variety**: Ensure a mix of:
+   - Full page patterns (seamless or distressed)
+   - Collage-style compositions (ephemera, torn paper, stamps)
+   - Focal point artistic illustrations with textured backgrounds
+   - Macro textures (aged paper, fabric, lace)
+2. **Aesthetics**: All images must look "Vintage", "Textured", "Distressed", and "High Quality".
+3. **Format**: Output ONLY the prompts, one per line. No numbering, no bullet points.
+4. **Content**: Each prompt must be a full, descriptive sentence.
+
+Example Prompt Style:
+"Aged parchment paper background featuring faded botanical illustrations of ferns and mushrooms, overlaid with vintage handwriting and coffee stains, high resolution, junk journal style."
+"""
+    if focus:
+        generation_prompt += f"\nFocus this set mainly on: {focus}.\n"
+    if avoid:
+        avoid_lines = "\n".join(f"- {p[:120]}" for p in avoid[:20])
+        generation_prompt += f"\nDo NOT repeat or closely paraphrase these existing prompts:\n{avoid_lines}\n"
+    generation_prompt += f"\nGenerate exactly {count} prompts now."
+    return generation_prompt
+
+
+def parse_prompts(text):
+    """Zerlegt die Modell-Antwort in einzelne Prompts (ohne Nummerierung/Bullets)."""
+    prompts = []
+    for line in text.strip().split('\n'):
+        cleaned = line.strip()
+        # Entferne Nummerierung (1. , 1), Bullets (*, -)
+        cleaned = re.sub(r'^[\d\.\)\-\*\s]+', '', cleaned)
+        cleaned = cleaned.strip('"').strip()
+        if cleaned:
+            prompts.append(cleaned)
+    return prompts
+
+
+def _word_set(prompt):
+    return frozenset(re.findall(r"[a-z0-9]+", prompt.lower()))
+
+
+def dedupe_prompts(prompts, existing=(), threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Entfernt exakte und fast identische Prompts (auch gegenüber `existing`)."""
+    kept = []
+    seen_words = [_word_set(p) for p in existing]
+    seen_exact = {" ".join(sorted(w)) for w in seen_words}
+
+    for prompt in prompts:
+        words = _word_set(prompt)
+        if not words:
+            continue
+        key = " ".join(sorted(words))
+        if key in seen_exact:
+            continue
+        if any(len(words & other) / len(words | other) >= threshold for other in seen_words):
+            continue
+        kept.append(prompt)
+        seen_words.append(words)
+        seen_exact.add(key)
+    return kept
+
+
+def _request_shard(client, theme, count, focus, avoid):
+    with metrics.span("llm_prompts"):
+        response = client.models.generate_content(
+            model=TEXT_MODEL,
+            contents=build_prompt_request(theme, count, focus=focus, avoid=avoid)
+        )
+    return parse_prompts(response.text)[:count]
+
+
+def generate_prompts(client, theme, count, refresh=False, log=print, **kwargs):
+    """Wie `generate_unique_prompts`, aber mit Festplatten-Cache (Modell, Prompt-Text, Anzahl).
+
+    Mit `refresh=True` wird der Cache umgangen. Unvollständige Ergebnisse werden nicht gecacht.
+    """
+    key = llm_cache.cache_key(TEXT_MODEL, build_prompt_request(theme, count), count)
+    if not refresh:
+        cached = llm_cache.get(key)
+        if cached:
+            log(f"♻️ {len(cached)} Prompts aus dem Cache")
+            return cached
+
+    prompts = generate_unique_prompts(client, theme, count, log=log, **kwargs)
+    if len(prompts) == count:
+        llm_cache.put(key, prompts)
+    return prompts
+
+
+def generate_unique_prompts(client, theme, count, shard_size=SHARD_SIZE, max_workers=MAX_PARALLEL_SHARDS,
+                            max_rounds=MAX_ROUNDS, log=print):
+    """Erzeugt `count` eindeutige Prompts, bei großen Mengen in parallelen Teil-Anfragen.
+
+    Doppelte Prompts werden verworfen und nur die fehlende Anzahl wird nachgefordert –
+    es wird nie mit Wiederholungen aufgefüllt. Im Extremfall kommen weniger als
+    `count` Prompts zurück.
+    """
+    prompts = []
+    for round_index in range(max_rounds):
+        missing = count - len(prompts)
+        if missing <= 0:
+            break
+
+        shard_counts = [shard_size] * (missing // shard_size)
+        if missing % shard_size:
+            shard_counts.append(missing % shard_size)
+        avoid = list(prompts) if round_index else None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_request_shard, client, theme, n,
+                                SHARD_FOCUS[i % len(SHARD_FOCUS)] if len(shard_counts) > 1 else None, avoid)
+                for i, n in enumerate(shard_counts)
+            ]
+            for future in futures:
+                try:
+                    prompts += dedupe_prompts(future.result(), existing=prompts)
+                except Exception as e:
+                    log(f"⚠️ Teil-Anfrage fehlgeschlagen: {e}")
+
+        if len(prompts) < count and round_index < max_rounds - 1:
+            log(f"⚠️ Nur {len(prompts)} eindeutige Prompts erhalten, fordere {count - len(prompts)} nach...")
+
+    return prompts[:count]
@@ -0,0 +1,214 @@
+import time
+import random
+import threading
+
+import metrics
+
+# --- KONFIGURATION ---
+# Aufrufe pro Sekunde und Burst je Endpoint (gilt pro Prozess, für alle Sessions und den Poller)
+ENDPOINT_LIMITS = {
+    "models.generate_content": (2.0, 5),
+    "files.upload": (2.0, 4),
+    "files.get": (5.0, 10),
+    "files.download": (2.0, 4),
+    "files.list": (1.0, 2),
+    "batches.create": (1.0, 4),
+    "batches.get": (5.0, 10),
+}
+DEFAULT_LIMIT = (5.0, 10)
+MAX_CONCURRENT_CALLS = 8     # gleichzeitige API-Aufrufe insgesamt
+MAX_RETRIES = 6
+BASE_DELAY = 1.0             # Sekunden, verdoppelt sich pro Versuch (mit Jitter)
+MAX_DELAY = 60.0
+MIN_RATE_FACTOR = 0.1        # bei 429 sinkt die Rate höchstens auf 10 % des Grundwerts
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Erzeugt bei 5xx eventuell trotzdem einen Job -> nur 429 wiederholen
+NON_IDEMPOTENT = ("batches.create",)
+# Verbindungsfehler aus requests/httpx/urllib3 (ohne sie importieren zu müssen)
+_CONNECTION_ERRORS = ("ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "RemoteProtocolError",
+                      "ProtocolError", "Timeout", "ServerDisconnectedError")
+
+
+def status_code(error):
+    """HTTP-Status einer SDK-Exception (`code`, `status_code` oder `response.status_code`)."""
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after(error):
+    """Sekunden aus `Retry-After` (Header oder Attribut), sonst None."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            value = headers.get("Retry-After") or headers.get("retry-after")
+        except AttributeError:
+            value = None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error, endpoint=None):
+    code = status_code(error)
+    if code is not None:
+        if endpoint in NON_IDEMPOTENT:
+            return code == 429
+        return code in RETRY_STATUS
+    if endpoint in NON_IDEMPOTENT:
+        return False
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in _CONNECTION_ERRORS
+
+
+class TokenBucket:
+    """Token-Bucket mit adaptiver Rate: 429 halbiert sie, Erfolge heben sie langsam wieder an."""
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wartet auf ein Token und gibt die Wartezeit in Sekunden zurück."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+                self._last = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+            waited += wait
+
+    def throttled(self, pause=None):
+        """Nach einem 429: Rate halbieren und ggf. den Endpoint für `pause` Sekunden sperren."""
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_FACTOR, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if pause:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+_concurrency = threading.BoundedSemaphore(MAX_CONCURRENT_CALLS)
+
+
+def bucket_for(endpoint):
+    with _buckets_lock:
+        bucket = _buckets.get(endpoint)
+        if bucket is None:
+            bucket = _buckets[endpoint] = TokenBucket(*ENDPOINT_LIMITS.get(endpoint, DEFAULT_LIMIT))
+    return bucket
+
+
+def backoff_delay(attempt, error=None):
+    """Exponentielles Backoff mit Full Jitter; `Retry-After` ist die Untergrenze."""
+    delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+    hint = retry_after(error) if error is not None else None
+    return max(delay, hint) if hint is not None else delay
+
+
+def _stream_positions(args, kwargs):
+    """Startpositionen aller Stream-Argumente (z.B. der Upload-Puffer), um sie vor Wiederholungen zurückzuspulen."""
+    positions = []
+    for value in (*args, *kwargs.values()):
+        if hasattr(value, "seek") and hasattr(value, "tell"):
+            try:
+                positions.append((value, value.tell()))
+            except (OSError, ValueError):
+                pass
+    return positions
+
+
+def call(endpoint, func, *args, **kwargs):
+    """Führt einen API-Aufruf gedrosselt aus und wiederholt 429/5xx/Verbindungsfehler.
+
+    Stream-Argumente (z.B. `files.upload(file=BytesIO(...))`) werden vor jeder
+    Wiederholung auf ihre Startposition zurückgesetzt, sonst würde der Retry leer hochladen.
+    Zähler: `api_calls_total`, `api_throttled_total` (429), `api_retries_total`
+    und `api_errors_total` je Endpoint; Wartezeiten im Histogramm `limiter_wait`.
+    """
+    bucket = bucket_for(endpoint)
+    streams = _stream_positions(args, kwargs)
+    attempt = 0
+    while True:
+        for stream, position in streams:
+            stream.seek(position)
+        waited = bucket.acquire()
+        if waited:
+            metrics.observe("limiter_wait", waited)
+        metrics.inc("api_calls_total", endpoint=endpoint)
+        try:
+            with _concurrency:
+                result = func(*args, **kwargs)
+        except Exception as e:
+            throttled = status_code(e) == 429
+            if throttled:
+                metrics.inc("api_throttled_total", endpoint=endpoint)
+                bucket.throttled(retry_after(e))
+            if attempt >= MAX_RETRIES or not is_retryable(e, endpoint):
+                metrics.inc("api_errors_total", endpoint=endpoint)
+                raise
+            delay = backoff_delay(attempt, e)
+            attempt += 1
+            metrics.inc("api_retries_total", endpoint=endpoint)
+            time.sleep(delay)
+            continue
+        bucket.succeeded()
+        return result
+
+
+class _Section:
+    """Leitet `client.<section>.<methode>(...)` über `call()` weiter."""
+
+    def __init__(self, name, target):
+        self._name = name
+        self._target = target
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value) or attr.startswith("_"):
+            return value
+        endpoint = f"{self._name}.{attr}"
+
+        def limited(*args, **kwargs):
+            return call(endpoint, value, *args, **kwargs)
+
+        return limited
+
+
+class RateLimitedClient:
+    """Hülle um `genai.Client` (oder `FakeGeminiClient`): `models`, `files` und `batches` gedrosselt.
+
+    Alle anderen Attribute (z.B. `download_base_url`, `close`) gehen direkt an den Client.
+    """
+
+    SECTIONS = ("models", "files", "batches")
+
+    def __init__(self, client):
+        self.client = client
+        for name in self.SECTIONS:
+            setattr(self, name, _Section(name, getattr(client, name)))
+
+    def __getattr__(self, attr):
+        return getattr(self.client, attr)
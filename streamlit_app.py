@@ -1,26 +1,20 @@
-import streamlit as st
-import os
-import json
 import time
-import requests
-from google import genai
-from PIL import Image
-from io import BytesIO
-from dotenv import load_dotenv
+_RUN_START = time.perf_counter()   # Startzeit dieses Skriptlaufs (für die Startzeit-Messung)
+
+import os
 import re
-import zipfile
+import streamlit as st
+import job_store
+import metrics
+from batch_ingest import IMAGE_EXTENSIONS
 
-# --- KONFIGURATION ---
+# Schwere Module (google.genai, PIL, numpy, requests) werden erst in der Funktion
+# importiert, die sie braucht – der Passwort-Bildschirm lädt nichts davon.
 
 # --- KONFIGURATION ---
 OUTPUT_FOLDER = "NanoBilder_Batch"
-BATCH_INFO_FOLDER = "NanoBilder_Batch" # Wo die JSONs liegen
-if not os.path.exists(OUTPUT_FOLDER):
-    os.makedirs(OUTPUT_FOLDER)
-
-# --- SETUP ---
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
+GALLERY_PAGE_SIZE = 12
+PAGES = ["🚀 Neuen Batch starten", "📂 Meine Batches & Bilder", "🖨️ Druck-Vorbereitung (A4)"]
 
 st.set_page_config(page_title="Etsy Junk Journal Generator", page_icon="🎨", layout="wide")
 
@@ -56,370 +50,515 @@ def check_password():
 if not check_password():
     st.stop()
 
+# --- SETUP (einmal pro Prozess, nicht bei jedem Rerun) ---
+@st.cache_resource
+def init_app():
+    """Lädt die .env und legt den Ausgabeordner an; gibt den API-Key zurück."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    return os.getenv("GOOGLE_API_KEY")
+
+API_KEY = init_app()
+
 # --- SIDEBAR ---
 st.sidebar.title("🎨 Konfiguration")
 if not API_KEY:
     st.sidebar.error("Kein API Key gefunden! Bitte .env prüfen.")
     st.stop()
 
-client = genai.Client(api_key=API_KEY)
+ingest_workers = st.sidebar.number_input(
+    "Ingest-Worker", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1,
+    help="Anzahl paralleler Worker beim Speichern heruntergeladener Bilder"
+)
+INGEST_MODES = {"Automatisch": None, "Threads": False, "Prozesse": True}
+ingest_processes = INGEST_MODES[st.sidebar.radio(
+    "Ingest-Modus", list(INGEST_MODES), horizontal=True,
+    help="Prozesse nutzen alle Kerne (JSON/Base64 halten den GIL); 'Automatisch' nimmt sie erst für große Ergebnisdateien"
+)]
+validate_images = st.sidebar.checkbox(
+    "Bilder beim Speichern prüfen", value=False,
+    help="Liest nur den Bild-Header (schnell), kein komplettes Dekodieren"
+)
+
+def get_client():
+    """Ein Client pro Prozess statt pro Rerun (SDK-Import erst beim ersten API-Aufruf)."""
+    import api_client
+    return api_client.get_client(API_KEY)
+
+@st.cache_resource
+def _poller_slot():
+    """Prozessweiter Platz für den Poller; er wird erst beim Einschalten gebaut."""
+    return {}
+
+def get_job_poller():
+    """Ein Poller pro Prozess, geteilt von allen Sessions."""
+    slot = _poller_slot()
+    if "poller" not in slot:
+        from job_poller import JobPoller
+        slot["poller"] = JobPoller(get_client(), API_KEY, log=lambda msg: None)
+    return slot["poller"]
+
+running_poller = _poller_slot().get("poller")
+auto_poll = st.sidebar.toggle(
+    "🔁 Offene Jobs automatisch prüfen", value=bool(running_poller and running_poller.running),
+    help="Ein Hintergrund-Thread prüft alle offenen Jobs und lädt fertige Bilder selbstständig"
+)
+if auto_poll:
+    poller = get_job_poller()
+    poller.ingest_workers = ingest_workers
+    poller.ingest_processes = ingest_processes
+    poller.start()
+    if poller.last_run:
+        st.sidebar.caption(f"Letzte Prüfung: {time.strftime('%H:%M:%S', time.localtime(poller.last_run))}")
+elif running_poller and running_poller.running:
+    running_poller.stop()
 
 # --- FUNKTIONEN (Portiert) ---
 
-def generate_theme(user_input=None):
-    base_instruction = "You are a creative director for a digital art shop on Etsy selling 'Junk Journal' background papers."
-    
-    if user_input and user_input.strip():
-        prompt = f"""{base_instruction}
-The user has suggested: "{user_input}".
-Based on this, define a specific, catchy, and commercially viable 'Collection Theme' name and a brief description.
-Output ONLY the Theme Name and Description in one line.
-Example: 'Vintage Beekeeper: A nostalgic collection of honeycomb patterns, vintage bee illustrations, and aged paper textures.'"""
-    else:
-        prompt = f"""{base_instruction}
-Brainstorm a unique, high-potential, and specific 'Collection Theme' for a new set of background papers.
-It should be distinct from generic themes. Think about niches like 'Steampunk Alice in Wonderland', 'Dark Academia Botany', 'Celestial Navigation', 'Victorian Gothic', 'Cottagecore Herbarium'.
-Output ONLY the Theme Name and Description in one line."""
-
-    response = client.models.generate_content(
-        model='gemini-2.0-flash-exp',
-        contents=prompt
-    )
-    return response.text.strip()
-
-def generate_prompts(theme, count):
-    generation_prompt = f"""Act as an expert AI art prompter.
-Target Audience: Etsy customers looking for "Junk Journal Background Pages".
-Collection Theme: "{theme}"
-
-Task: Generate {count} HIGHLY DETAILED and UNIQUE image generation prompts for this collection.
-
-Requirements:
-1. **Variety**: Ensure a mix of:
-   - Full page patterns (seamless or distressed)
-   - Collage-style compositions (ephemera, torn paper, stamps)
-   - Focal point artistic illustrations with textured backgrounds
-   - Macro textures (aged paper, fabric, lace)
-2. **Aesthetics**: All images must look "Vintage", "Textured", "Distressed", and "High Quality".
-3. **Format**: Output ONLY the prompts, one per line. No numbering, no bullet points.
-4. **Content**: Each prompt must be a full, descriptive sentence.
-
-Generate exactly {count} prompts now."""
-
-    response = client.models.generate_content(
-        model='gemini-2.0-flash-exp',
-        contents=generation_prompt
-    )
-    
-    lines = response.text.strip().split('\n')
-    prompts = []
-    for line in lines:
-        cleaned = line.strip()
-        cleaned = re.sub(r'^[\d\.\-\*\s]+', '', cleaned)
-        if cleaned:
-            prompts.append(cleaned)
-            
-    # Auffüllen falls nötig
-    if len(prompts) < count:
-        while len(prompts) < count:
-            prompts.append(prompts[len(prompts)%len(prompts)])
-            
-    return prompts[:count]
-
-def save_job_info(job_id, theme, prompts):
-    clean_job_id = job_id.split('/')[-1]
-    info = {
-        "job_id": job_id,
-        "theme": theme,
-        "timestamp": time.time(),
-        "status": "SUBMITTED",
-        "prompts": prompts
-    }
-    filename = f"{BATCH_INFO_FOLDER}/batch_job_{clean_job_id}.json"
-    with open(filename, "w") as f:
-        json.dump(info, f, indent=4)
-    return filename
+def generate_theme(user_input=None, refresh=False):
+    import prompt_generation
+    return prompt_generation.generate_theme(get_client(), user_input, refresh=refresh)
+
+def generate_prompts(theme, count, refresh=False):
+    # Parallel in Teil-Anfragen, ohne Duplikate (kein Auffüllen mit Wiederholungen)
+    import prompt_generation
+    return prompt_generation.generate_prompts(get_client(), theme, count, refresh=refresh, log=st.write)
 
 def get_all_jobs():
-    jobs = []
-    if not os.path.exists(BATCH_INFO_FOLDER):
-        return []
-        
-    files = [f for f in os.listdir(BATCH_INFO_FOLDER) if f.startswith("batch_job_") and f.endswith(".json")]
-    for f in files:
-        try:
-            with open(os.path.join(BATCH_INFO_FOLDER, f), "r") as file:
-                data = json.load(file)
-                data['filename'] = f
-                jobs.append(data)
-        except:
-            pass
-    # Sortieren nach Timestamp (neueste zuerst)
-    jobs.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-    return jobs
-
-def process_downloaded_content(text_content, job_id):
-    results = text_content.strip().split('\n')
-    images = []
-    
-    # Erstelle Unterordner für diesen Job
-    clean_job_id = job_id.split('/')[-1]
-    job_folder = os.path.join(OUTPUT_FOLDER, clean_job_id)
-    if not os.path.exists(job_folder):
-        os.makedirs(job_folder)
-        
-    count = 0
-    for line in results:
-        try:
-            result_json = json.loads(line)
-            # Check for valid response
-            if "response" in result_json and "candidates" in result_json["response"]:
-                candidates = result_json["response"]["candidates"]
-                if candidates and "content" in candidates[0]:
-                    parts = candidates[0]["content"]["parts"]
-                    for part in parts:
-                        if "inlineData" in part:
-                            img_data_b64 = part["inlineData"]["data"]
-                            import base64
-                            img_bytes = base64.b64decode(img_data_b64)
-                            
-                            # Speichern
-                            filename = f"{job_folder}/img_{count}.png"
-                            with open(filename, "wb") as f:
-                                f.write(img_bytes)
-                            
-                            images.append(filename)
-                            count += 1
-        except Exception:
-            pass
-    return images
-
-def create_zip_of_folder(folder_path):
-    """Erstellt ein ZIP-Archiv im Speicher aus einem Ordner."""
-    memory_file = BytesIO()
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if file.endswith(".png"):
-                    file_path = os.path.join(root, file)
-                    zf.write(file_path, os.path.basename(file_path))
-    memory_file.seek(0)
-    return memory_file
-
-def convert_to_a4(image):
-    """Konvertiert ein Bild zu DIN A4 (300 DPI) mittels Lanczos-Filter."""
-    # A4 bei 300 DPI
-    A4_WIDTH = 2480
-    A4_HEIGHT = 3508
-    
-    target_ratio = A4_WIDTH / A4_HEIGHT
-    img_ratio = image.width / image.height
-    
-    # 1. Skalieren (Aspect Ratio beibehalten, so dass es A4 füllt)
-    if img_ratio > target_ratio:
-        # Bild ist breiter als A4 -> Höhe anpassen
-        new_height = A4_HEIGHT
-        new_width = int(new_height * img_ratio)
-    else:
-        # Bild ist schmaler als A4 -> Breite anpassen
-        new_width = A4_WIDTH
-        new_height = int(new_width / img_ratio)
-        
-    resized_img = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-    
-    # 2. Center Crop auf exakt A4
-    left = (new_width - A4_WIDTH) / 2
-    top = (new_height - A4_HEIGHT) / 2
-    right = (new_width + A4_WIDTH) / 2
-    bottom = (new_height + A4_HEIGHT) / 2
-    
-    return resized_img.crop((left, top, right, bottom))
+    # Nur Metadaten aus dem SQLite-Index, Prompts werden bei Bedarf geladen
+    return job_store.list_jobs()
 
-# --- UI ---
+@st.cache_resource(max_entries=1)
+def _hash_index(version):
+    import image_hash
+    return image_hash.load_index()
 
-st.title("🎨 Etsy Junk Journal Generator")
+def get_hash_index():
+    # BK-Baum über alle Bild-Hashes, neu gebaut nur wenn sich die Hash-Tabelle geändert hat
+    import image_hash
+    return _hash_index(image_hash.index_version())
 
-tab1, tab2, tab3 = st.tabs(["🚀 Neuen Batch starten", "📂 Meine Batches & Bilder", "🖨️ Druck-Vorbereitung (A4)"])
+def list_job_images(job_dir):
+    # Nur die Originale direkt im Job-Ordner (Druckseiten liegen in Unterordnern)
+    return sorted(
+        (os.path.join(job_dir, f) for f in os.listdir(job_dir) if f.lower().endswith(IMAGE_EXTENSIONS)),
+        key=lambda p: (len(p), p)
+    )
+
+# --- UI ---
+
+def render_new_batch():
+    """Seite 1: Thema und Prompts erzeugen, Kollektion einreichen."""
+    import batch_submit
 
-with tab1:
     st.header("Neues Set erstellen")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         user_idea = st.text_input("Deine Idee (Optional)", placeholder="z.B. Christmas Steampunk, Mushroom Fairy...")
-        num_images = st.slider("Anzahl Bilder", min_value=10, max_value=100, value=20, step=10)
+        num_images = st.slider("Anzahl Bilder", min_value=10, max_value=500, value=20, step=10,
+                               help=f"Ab {batch_submit.MAX_REQUESTS_PER_JOB} Bildern wird auf mehrere Batch-Jobs verteilt")
+        regenerate = st.checkbox("🔄 Neu generieren (Cache ignorieren)", value=False)
+    
+    with col2:
+        # Fan-out: eine Kollektion auf mehrere parallele Jobs verteilen
+        models = st.multiselect("Modelle", batch_submit.IMAGE_MODELS, default=[batch_submit.IMAGE_MODEL])
+        aspect_ratios = st.multiselect("Seitenverhältnisse", batch_submit.ASPECT_RATIOS, default=[],
+                                       help="Leer = Standardformat des Modells")
+        variants = batch_submit.build_variants(models or [batch_submit.IMAGE_MODEL], aspect_ratios)
+        split = True
+        if len(variants) > 1:
+            split = st.radio(
+                "Varianten", ["Prompts aufteilen", "Jede Variante alle Prompts"], horizontal=True,
+                help="Aufteilen: jede Variante erzeugt einen Teil der Kollektion (schneller fertig)"
+            ) == "Prompts aufteilen"
+            st.caption(f"{len(variants)} Varianten: " + ", ".join(v['name'] for v in variants))
     
     if st.button("✨ Thema & Prompts generieren", type="primary"):
         with st.status("Arbeite...", expanded=True) as status:
+            timings = {}
             st.write("🧠 Entwickle Thema...")
-            theme = generate_theme(user_idea)
+            with metrics.span("theme", timings):
+                theme = generate_theme(user_idea, refresh=regenerate)
             st.info(f"Thema: **{theme}**")
             
             st.write(f"📝 Schreibe {num_images} Prompts...")
-            prompts = generate_prompts(theme, num_images)
+            with metrics.span("prompts", timings):
+                prompts = generate_prompts(theme, num_images, refresh=regenerate)
             st.success(f"{len(prompts)} Prompts erstellt!")
             
             # Batch Job starten
             st.write("☁️ Sende an Google Batch API...")
             
-            # Temp File erstellen
-            batch_filename = "temp_streamlit_batch.jsonl"
-            with open(batch_filename, "w") as f:
-                for p in prompts:
-                    req = {
-                        "request": {
-                            "contents": [{"parts": [{"text": p}]}],
-                            "generation_config": {"response_modalities": ["IMAGE"]}
-                        }
-                    }
-                    f.write(json.dumps(req) + "\n")
-            
-            # Upload & Start
+            # Anfragen im Speicher bauen; große Kollektionen werden auf mehrere Jobs verteilt
             try:
-                batch_file = client.files.upload(file=batch_filename, config={'mime_type': 'application/json'})
-                batch_job = client.batches.create(
-                    model="gemini-3-pro-image-preview",
-                    src=batch_file.name
+                collection_id, job_ids, errors = batch_submit.submit_collection(
+                    get_client(), theme, prompts, timings=timings, variants=variants, split=split
                 )
+                for error in errors:
+                    st.error(f"Fehler bei einem Teil-Job: {error}")
                 
-                save_job_info(batch_job.name, theme, prompts)
-                st.balloons()
-                st.success(f"Batch Job gestartet! ID: {batch_job.name}")
-                os.remove(batch_filename)
+                if job_ids:
+                    st.balloons()
+                    st.success(f"{len(job_ids)} Batch Job(s) gestartet! Kollektion: {collection_id}")
+                    for job_id in job_ids:
+                        st.write(f"🆔 {job_id}")
                 
             except Exception as e:
                 st.error(f"Fehler beim Starten: {e}")
             
+            metrics.write_metrics()
             status.update(label="Fertig!", state="complete", expanded=False)
 
-with tab2:
+def render_history():
+    """Seite 2: Jobs, Status-Prüfung, Galerie und ZIP-Download."""
+    import ingest_journal
+    from job_poller import IN_PROGRESS, check_and_ingest
+
     st.header("Verlauf")
+    render_search()
+    
+    # Kollektionen mit mehreren Jobs (Aufteilung / Varianten): eine gemeinsame Galerie,
+    # die mit jedem fertigen Job wächst
+    collections = [c for c in job_store.list_collections() if c['jobs'] > 1]
+    if collections:
+        st.subheader("🗂️ Kollektionen")
+        for collection in collections:
+            collection_id = collection['collection_id']
+            with st.expander(f"{collection.get('theme') or 'Unbekannt'} – {collection['completed']}/{collection['jobs']} "
+                             f"Jobs fertig, {collection['image_count']} Bilder"):
+                members = job_store.list_collection(collection_id)
+                st.write(" · ".join(f"{m.get('variant') or m.get('model') or '?'}: {m['status']}" for m in members))
+                folders = [os.path.join(OUTPUT_FOLDER, m['job_id'].split('/')[-1]) for m in members]
+                images = [img for folder in folders if os.path.isdir(folder) for img in list_job_images(folder)]
+                if images and st.toggle(f"📸 Alle Bilder der Kollektion ({len(images)})", key=f"show_{collection_id}"):
+                    render_gallery(images, collection_id, OUTPUT_FOLDER, collection_id)
+        st.subheader("📄 Einzelne Jobs")
     
     jobs = get_all_jobs()
     if not jobs:
         st.info("Noch keine Jobs gefunden.")
     else:
+        failed_lines = ingest_journal.failed_counts()
         for job in jobs:
             with st.expander(f"{job.get('theme', 'Unbekannt')} ({job.get('status')}) - {job.get('job_id')}"):
                 st.write(f"**Job ID:** {job['job_id']}")
+                if job.get('collection_id'):
+                    st.write(f"**Kollektion:** {job['collection_id']}")
+                if job.get('variant'):
+                    st.write(f"**Variante:** {job['variant']}")
                 st.write(f"**Erstellt:** {time.ctime(job.get('timestamp', 0))}")
+                if st.checkbox("Prompts anzeigen", key=f"prompts_{job['job_id']}"):
+                    st.write(job_store.get_prompts(job['job_id']))
+                timings = job.get('timings')
+                if timings:
+                    st.caption("⏱️ " + " · ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items()))
+                failed = failed_lines.get(job['job_id'])
+                if failed:
+                    st.warning(f"{failed} Ergebniszeilen konnten nicht gespeichert werden – "
+                               "'Status prüfen & Laden' wiederholt nur diese.")
+                    if st.checkbox("Fehler anzeigen", key=f"ingest_errors_{job['job_id']}"):
+                        st.table(ingest_journal.failures(job['job_id']))
                 
                 col_check, col_del = st.columns([1, 4])
                 
-                if col_check.button("Status prüfen & Laden", key=f"btn_{job['job_id']}"):
+                busy = (job.get('claimed_until') or 0) >= time.time()
+                if busy:
+                    col_del.info("⬇️ Wird gerade im Hintergrund geladen...")
+                if col_check.button("Status prüfen & Laden", key=f"btn_{job['job_id']}", disabled=busy):
                     try:
-                        api_job = client.batches.get(name=job['job_id'])
-                        st.write(f"Status: **{api_job.state}**")
-                        
-                        if api_job.state == "JOB_STATE_SUCCEEDED":
-                            st.success("Job fertig! Lade Bilder...")
-                            
-                            # Download Logic
-                            file_name = api_job.dest.file_name
-                            content = ""
-                            
-                            try:
-                                content_bytes = client.files.download(file=file_name)
-                                content = content_bytes.decode('utf-8')
-                            except:
-                                # Fallback Search
-                                for f in client.files.list():
-                                    if f.name == file_name:
-                                        headers = {"x-goog-api-key": API_KEY}
-                                        resp = requests.get(f.uri, headers=headers, params={'alt': 'media'})
-                                        if resp.status_code == 200:
-                                            content = resp.text
-                                        break
-                            
-                            if content:
-                                images = process_downloaded_content(content, job['job_id'])
-                                st.success(f"{len(images)} Bilder gespeichert!")
-                                
-                                # Update JSON status
-                                job['status'] = "COMPLETED"
-                                job['image_count'] = len(images)
-                                with open(os.path.join(BATCH_INFO_FOLDER, job['filename']), "w") as f:
-                                    json.dump(job, f, indent=4)
-                                    
-                                st.rerun() # Refresh UI
-                            else:
-                                st.error("Konnte Datei nicht herunterladen.")
+                        with st.spinner("Prüfe Status & lade Bilder..."):
+                            result = check_and_ingest(get_client(), API_KEY, job['job_id'],
+                                                      ingest_workers=ingest_workers, validate=validate_images,
+                                                      use_processes=ingest_processes)
+                        metrics.write_metrics()
+                        if result == "COMPLETED":
+                            st.success("Job fertig! Bilder gespeichert.")
+                            st.rerun() # Refresh UI
+                        elif result == "FAILED":
+                            st.error("Job fehlgeschlagen.")
+                        elif result == IN_PROGRESS:
+                            st.info("⬇️ Der Job wird gerade im Hintergrund geladen.")
+                        else:
+                            st.info("⏳ Der Job läuft noch.")
                                 
                     except Exception as e:
                         st.error(f"Fehler beim Prüfen: {e}")
 
-                # Bilder anzeigen wenn vorhanden
+                # Bilder anzeigen wenn vorhanden (nur für aufgeklappte Jobs laden)
                 clean_id = job['job_id'].split('/')[-1]
                 job_dir = os.path.join(OUTPUT_FOLDER, clean_id)
                 
-                if os.path.exists(job_dir):
-                    images = [os.path.join(job_dir, f) for f in os.listdir(job_dir) if f.endswith(".png")]
+                if os.path.exists(job_dir) and st.toggle(
+                    f"📸 Bilder anzeigen ({job.get('image_count') or '?'})", key=f"show_{clean_id}"
+                ):
+                    images = list_job_images(job_dir)
+                    archive_name = clean_id
+                    if images and st.checkbox("Duplikate ausblenden", key=f"dedup_{clean_id}"):
+                        import image_hash
+                        total = len(images)
+                        images = image_hash.collapse_duplicates(images, job_id=job['job_id'])
+                        archive_name = f"{clean_id}-unique"
+                        st.caption(f"{total - len(images)} fast identische Bilder ausgeblendet")
                     if images:
-                        st.write(f"📸 {len(images)} Bilder verfügbar:")
-                        
-                        # 1. Download Button für alle
-                        zip_data = create_zip_of_folder(job_dir)
-                        st.download_button(
-                            label="📦 Alle Bilder als ZIP herunterladen",
-                            data=zip_data,
-                            file_name=f"images_{clean_id}.zip",
-                            mime="application/zip",
-                            type="primary",
-                            key=f"zip_btn_{clean_id}"
-                        )
-                        
-                        # 2. Galerie (Grid Layout)
-                        cols = st.columns(3) # 3 Bilder pro Reihe
-                        for idx, img_path in enumerate(images):
-                            with cols[idx % 3]:
-                                st.image(img_path, use_container_width=True)
-
-with tab3:
-    st.header("🖨️ Bilder für Druck vorbereiten (DIN A4)")
-    st.write("Lade deine Favoriten hoch. Sie werden automatisch auf **DIN A4 (300 DPI)** hochskaliert und zugeschnitten.")
+                        render_gallery(images, clean_id, job_dir, archive_name)
+
+def print_selection(img_path):
+    # Druck-Auswahl pro Job-Ordner (von Galerie und Seite 3 geteilt)
+    folder = os.path.basename(os.path.dirname(img_path))
+    return st.session_state.setdefault(f"print_sel_{folder}", set())
+
+def render_search():
+    """Volltextsuche über die Prompts aller Jobs (Bild-Manifest mit FTS-Index)."""
+    import image_manifest
+
+    col_query, col_index = st.columns([4, 1])
+    with col_query:
+        query = st.text_input("🔎 Bilder suchen", placeholder="z.B. mushrooms watercolor", key="search_query")
+    with col_index:
+        st.write("")
+        if st.button("🗂️ Index aktualisieren", help="Ältere Jobs nachträglich ins Manifest aufnehmen"):
+            with st.spinner("Indexiere alle Jobs..."):
+                added = image_manifest.index_all()
+            st.toast(f"{added} Bilder eingetragen")
+    if not query.strip():
+        return
+
+    start = time.perf_counter()
+    hits = image_manifest.search(query)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(hits)} Treffer in {elapsed_ms:.0f} ms"
+               + (f" (erste {image_manifest.SEARCH_LIMIT})" if len(hits) >= image_manifest.SEARCH_LIMIT else ""))
+    if hits:
+        slug = "-".join(re.findall(r"\w+", query.lower()))[:40] or "suche"
+        render_gallery([hit["path"] for hit in hits], "search", OUTPUT_FOLDER, f"suche-{slug}")
+
+def render_gallery(images, gallery_key, archive_folder, archive_name):
+    """ZIP-Download, Vollbild und seitenweise Galerie für eine Bildliste (ein Job oder eine ganze Kollektion)."""
+    from thumbnails import get_thumbnail
+    from archive_cache import get_folder_archive
+
+    # 1. Download Button für alle (Archiv wird nur bei geänderten Dateien neu gebaut)
+    zip_path = get_folder_archive(archive_folder, name=archive_name, files=images, build=False)
+    if zip_path is None and st.button("📦 ZIP vorbereiten", key=f"zip_build_{gallery_key}"):
+        with st.spinner("Erstelle ZIP..."):
+            zip_path = get_folder_archive(archive_folder, name=archive_name, files=images)
+        metrics.write_metrics()
+    if zip_path:
+        with open(zip_path, "rb") as zip_file:
+            st.download_button(
+                label="📦 Alle Bilder als ZIP herunterladen",
+                data=zip_file,
+                file_name=f"images_{archive_name}.zip",
+                mime="application/zip",
+                type="primary",
+                key=f"zip_btn_{gallery_key}"
+            )
+
+    # 2. Vollbild nur auf Anfrage
+    full_key = f"full_{gallery_key}"
+    if st.session_state.get(full_key):
+        st.image(st.session_state[full_key], use_container_width=True)
+        import image_hash
+        import image_manifest
+        entry = image_manifest.get_entry(st.session_state[full_key])
+        if entry and entry.get("prompt"):
+            st.caption(f"**Prompt ({entry['request_key']}):** {entry['prompt']} – {entry['width']}×{entry['height']} px, "
+                       f"{entry['bytes'] / (1024 * 1024):.1f} MB")
+        similar = image_hash.find_similar(st.session_state[full_key], tree=get_hash_index())
+        if similar:
+            st.caption("Ähnliche Bilder in allen Jobs: " + ", ".join(
+                f"{os.path.relpath(path, OUTPUT_FOLDER)} (Abstand {d})" for d, (path, _) in similar[:10]
+            ))
+        if st.button("✖️ Vollbild schließen", key=f"close_{gallery_key}"):
+            del st.session_state[full_key]
+            st.rerun()
+
+    # 3. Galerie (Grid Layout, seitenweise mit Vorschaubildern)
+    pages = (len(images) + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Seite (von {pages})", min_value=1, max_value=pages, value=1, key=f"page_{gallery_key}")
+    page_images = images[(page - 1) * GALLERY_PAGE_SIZE:page * GALLERY_PAGE_SIZE]
+
+    cols = st.columns(3) # 3 Bilder pro Reihe
+    for idx, img_path in enumerate(page_images):
+        with cols[idx % 3]:
+            try:
+                st.image(get_thumbnail(img_path), use_container_width=True)
+            except Exception:
+                st.image(img_path, use_container_width=True)
+            if st.button("🔍", key=f"zoom_{gallery_key}_{img_path}"):
+                st.session_state[full_key] = img_path
+                st.rerun()
+            # Auswahl für die Druck-Vorbereitung (Seite 3 arbeitet direkt mit den Dateien)
+            selection = print_selection(img_path)
+            if st.checkbox("🖨️ Für Druck auswählen", value=img_path in selection,
+                           key=f"sel_{gallery_key}_{img_path}"):
+                selection.add(img_path)
+            else:
+                selection.discard(img_path)
+    selected = sum(1 for img_path in images if img_path in print_selection(img_path))
+    if selected:
+        st.caption(f"🖨️ {selected} Bilder für den Druck ausgewählt – weiter unter '{PAGES[2]}'.")
+
+def render_print_from_job(paper):
+    """Druckseiten aus einem vorhandenen Job-Ordner – ohne Download und erneuten Upload."""
+    from archive_cache import get_folder_archive
+    from print_convert import convert_job_images, print_folder_for
+
+    jobs = [j for j in get_all_jobs() if os.path.isdir(os.path.join(OUTPUT_FOLDER, j['job_id'].split('/')[-1]))]
+    if not jobs:
+        st.info("Noch keine Job-Ordner mit Bildern gefunden.")
+        return
+
+    job = st.selectbox(
+        "Job", jobs,
+        format_func=lambda j: f"{j.get('theme', 'Unbekannt')[:60]} – {j['job_id'].split('/')[-1]} ({j.get('image_count') or '?'} Bilder)"
+    )
+    clean_id = job['job_id'].split('/')[-1]
+    job_dir = os.path.join(OUTPUT_FOLDER, clean_id)
+    images = list_job_images(job_dir)
+    selection = st.session_state.get(f"print_sel_{clean_id}", set())
+
+    scope = st.radio("Umfang", ["Ganzer Job", "Ausgewählte Bilder"], index=1 if selection else 0,
+                     horizontal=True, key=f"print_scope_{clean_id}")
+    if scope == "Ausgewählte Bilder":
+        chosen = st.multiselect("Bilder", images, default=[p for p in images if p in selection],
+                                format_func=os.path.basename, key=f"print_pick_{clean_id}")
+    else:
+        chosen = images
+
+    out_folder = print_folder_for(job_dir, paper)
+    st.caption(f"Die Seiten werden in `{out_folder}` gespeichert; schon konvertierte Bilder werden übersprungen.")
+    pages_key = f"print_pages_{clean_id}_{paper}"
+    if chosen and st.button(f"✨ {len(chosen)} Bilder konvertieren", type="primary"):
+        progress_bar = st.progress(0)
+        st.session_state[pages_key] = convert_job_images(
+            chosen, job_dir, preset=paper,
+            progress=lambda done, total: progress_bar.progress(done / total if total else 1.0)
+        )
+        metrics.write_metrics()
+        st.success(f"Fertig! {len(st.session_state[pages_key])} Seiten in {out_folder}")
+
+    pages = [p for p in st.session_state.get(pages_key, []) if os.path.exists(p)]
+    if pages:
+        zip_path = get_folder_archive(out_folder, name=f"{clean_id}-{paper}", files=pages)
+        with open(zip_path, "rb") as zip_file:
+            st.download_button(
+                label=f"📦 {len(pages)} {paper}-Seiten herunterladen (ZIP)",
+                data=zip_file,
+                file_name=f"{paper}_Print_Ready_{clean_id}.zip",
+                mime="application/zip",
+                key=f"print_zip_{clean_id}_{paper}"
+            )
+
+    render_export(clean_id, job_dir, chosen, pages, paper)
+
+def render_export(clean_id, job_dir, originals, pages, paper):
+    """Export-Profile (z.B. Etsy-JPEG ≤ 20 MB) für die Originale oder die fertigen Druckseiten."""
+    from archive_cache import get_folder_archive
+    from export_profiles import EXPORT_PROFILES, export_folder_for, export_images
+    from print_convert import print_folder_for
+
+    st.subheader("📤 Export")
+    col_profile, col_source = st.columns(2)
+    with col_profile:
+        profile = st.selectbox("Export-Profil", list(EXPORT_PROFILES),
+                               format_func=lambda key: EXPORT_PROFILES[key]["label"], key=f"export_profile_{clean_id}")
+    with col_source:
+        sources = ["Originale"] + (["Druckseiten"] if pages else [])
+        source = st.radio("Quelle", sources, horizontal=True, key=f"export_source_{clean_id}")
+    paths, folder = (pages, print_folder_for(job_dir, paper)) if source == "Druckseiten" else (originals, job_dir)
+
+    out_folder = export_folder_for(folder, profile)
+    export_key = f"export_files_{clean_id}_{source}_{profile}"
+    if paths and st.button(f"📤 {len(paths)} Bilder exportieren", key=f"export_btn_{clean_id}"):
+        progress_bar = st.progress(0)
+        st.session_state[export_key] = export_images(
+            paths, folder, profile,
+            progress=lambda done, total: progress_bar.progress(done / total if total else 1.0)
+        )
+        metrics.write_metrics()
+
+    exported = [p for p in st.session_state.get(export_key, []) if os.path.exists(p)]
+    if exported:
+        total_mb = sum(os.path.getsize(p) for p in exported) / (1024 * 1024)
+        st.caption(f"{len(exported)} Dateien, zusammen {total_mb:.1f} MB, in `{out_folder}`")
+        zip_path = get_folder_archive(out_folder, name=f"{clean_id}-{source}-{profile}", files=exported)
+        with open(zip_path, "rb") as zip_file:
+            st.download_button(
+                label=f"📦 Export herunterladen (ZIP, {total_mb:.1f} MB)",
+                data=zip_file,
+                file_name=f"{profile}_{clean_id}.zip",
+                mime="application/zip",
+                key=f"export_zip_{clean_id}_{source}_{profile}"
+            )
+
+def render_print_upload(paper):
+    """Druckseiten aus hochgeladenen Bildern (für Dateien, die nicht auf dem Server liegen)."""
+    from archive_cache import ARCHIVE_FOLDER
+    from print_convert import PAPER_LABELS, PRINT_DPI, convert_batch_to_zip
+
+    st.write(f"Lade deine Favoriten hoch. Sie werden automatisch auf **{PAPER_LABELS[paper]} ({PRINT_DPI} DPI)** hochskaliert und zugeschnitten.")
     
     uploaded_files = st.file_uploader("Bilder auswählen", accept_multiple_files=True, type=['png', 'jpg', 'jpeg'])
     
     if uploaded_files:
         if st.button(f"✨ {len(uploaded_files)} Bilder konvertieren"):
             progress_bar = st.progress(0)
-            processed_images = []
-            
-            # Temp Ordner für ZIP
             timestamp = int(time.time())
-            upscale_folder = f"Upscaled_A4_{timestamp}"
-            os.makedirs(upscale_folder, exist_ok=True)
             
-            for i, uploaded_file in enumerate(uploaded_files):
-                # Laden
-                image = Image.open(uploaded_file)
-                
-                # Konvertieren
-                a4_image = convert_to_a4(image)
-                
-                # Speichern
-                save_path = os.path.join(upscale_folder, f"A4_{uploaded_file.name}")
-                a4_image.save(save_path, quality=95)
-                processed_images.append(save_path)
-                
-                progress_bar.progress((i + 1) / len(uploaded_files))
+            # Parallel konvertieren und fertige Seiten direkt ins ZIP schreiben (kein Temp-Ordner)
+            os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+            zip_path = os.path.join(ARCHIVE_FOLDER, f"{paper}_Print_Ready_{timestamp}.zip")
+            sources = ((f.name, f.getvalue()) for f in uploaded_files)
+            convert_batch_to_zip(
+                sources, zip_path, preset=paper,
+                progress=lambda done: progress_bar.progress(done / len(uploaded_files))
+            )
             
+            metrics.write_metrics()
             st.success("Fertig!")
             
-            # ZIP erstellen
-            zip_data = create_zip_of_folder(upscale_folder)
-            st.download_button(
-                label="📦 Alle A4-Bilder herunterladen (ZIP)",
-                data=zip_data,
-                file_name=f"A4_Print_Ready_{timestamp}.zip",
-                mime="application/zip",
-                type="primary"
-            )
+            with open(zip_path, "rb") as zip_file:
+                st.download_button(
+                    label=f"📦 Alle {paper}-Bilder herunterladen (ZIP)",
+                    data=zip_file,
+                    file_name=f"{paper}_Print_Ready_{timestamp}.zip",
+                    mime="application/zip",
+                    type="primary"
+                )
             
-            # Aufräumen (Ordner löschen)
-            import shutil
-            shutil.rmtree(upscale_folder)
-                                # Optional: Einzeldownload
-                                # with open(img_path, "rb") as file:
-                                #     st.download_button("⬇️", file, file_name=os.path.basename(img_path), key=f"dl_{clean_id}_{idx}")
+            # Aufräumen (Streamlit hält die Daten für den Download selbst)
+            os.remove(zip_path)
+
+def render_print():
+    """Seite 3: Bilder auf Papierformate konvertieren."""
+    from print_convert import PAPER_PRESETS, PAPER_LABELS
+
+    st.header("🖨️ Bilder für Druck vorbereiten")
+    paper = st.selectbox("Papierformat", list(PAPER_PRESETS), format_func=lambda k: PAPER_LABELS[k])
+    source = st.radio("Quelle", ["📂 Aus meinen Jobs", "⬆️ Hochladen"], horizontal=True, key="print_source")
+    if source.startswith("📂"):
+        render_print_from_job(paper)
+    else:
+        render_print_upload(paper)
+
+st.title("🎨 Etsy Junk Journal Generator")
+
+# Nur die gewählte Seite wird ausgeführt (st.tabs würde bei jedem Rerun alle drei rendern)
+page = st.radio("Bereich", PAGES, horizontal=True, label_visibility="collapsed", key="page")
+if page == PAGES[0]:
+    render_new_batch()
+elif page == PAGES[1]:
+    render_history()
+else:
+    render_print()
+
+# --- STARTZEIT-MESSUNG ---
+run_seconds = time.perf_counter() - _RUN_START
+metrics.observe("app_rerun", run_seconds)
+st.sidebar.caption(f"⏱️ Skriptlauf: {run_seconds * 1000:.0f} ms")
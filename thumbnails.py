@@ -0,0 +1,52 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- KONFIGURATION ---
+OUTPUT_FOLDER = "NanoBilder_Batch"
+THUMB_FOLDER = os.path.join(OUTPUT_FOLDER, ".thumbs")
+THUMB_SIZE = (480, 480)
+THUMB_FORMAT = "WEBP"
+THUMB_QUALITY = 80
+
+
+def thumbnail_path(src_path, size=THUMB_SIZE):
+    """Cache-Pfad einer Vorschau: Schlüssel aus Quellpfad, mtime und Größe."""
+    stat = os.stat(src_path)
+    key = f"{os.path.abspath(src_path)}:{stat.st_mtime_ns}:{stat.st_size}:{size[0]}x{size[1]}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(THUMB_FOLDER, f"{digest}.{THUMB_FORMAT.lower()}")
+
+
+def get_thumbnail(src_path, size=THUMB_SIZE):
+    """Gibt den Pfad einer kleinen Vorschau zurück und erzeugt sie beim ersten Aufruf."""
+    thumb_path = thumbnail_path(src_path, size)
+    if os.path.exists(thumb_path):
+        return thumb_path
+
+    from PIL import Image
+    os.makedirs(THUMB_FOLDER, exist_ok=True)
+    with Image.open(src_path) as image:
+        # Bei JPEGs direkt verkleinert dekodieren (spart fast die ganze Dekodierzeit)
+        image.draft("RGB", size)
+        image.thumbnail(size)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        # Eindeutig pro Prozess und Thread: Poller und Galerie erzeugen evtl. dieselbe Vorschau
+        tmp_path = f"{thumb_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, THUMB_FORMAT, quality=THUMB_QUALITY)
+    os.replace(tmp_path, thumb_path)
+    return thumb_path
+
+
+def warm_thumbnails(paths, workers=4):
+    """Erzeugt Vorschauen für viele Bilder vorab (z.B. direkt nach dem Ingest)."""
+    def safe(path):
+        try:
+            return get_thumbnail(path)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(safe, paths))